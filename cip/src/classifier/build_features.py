@@ -1,13 +1,13 @@
 # cip/src/classifier/build_features.py
+#
+#   python -m classifier.build_features --workers 4 --shard-size 2048
+#
+# Sharded and resumable: re-running after a crash continues from the
+# last completed shard (see classifier/feature_builder.py).
 
-import os
-import numpy as np
-import pandas as pd
-from tqdm import tqdm
+import argparse
 
-from preprocessing.module2_preprocess import module2_process
-from classifier.feature_extractor import DistilBERTFeatureExtractor
-from negation.nli_scorer import NLIScorer
+from classifier.feature_builder import build_features
 
 
 INPUT_PATH = "../data/processed/truthfulqa_pairs.csv"
@@ -16,59 +16,34 @@ OUTPUT_y = "../data/processed/y.npy"
 
 
 def main():
-
-    df = pd.read_csv(INPUT_PATH)
-
-    extractor = DistilBERTFeatureExtractor()
-    nli = NLIScorer()
-
-    features = []
-    labels = []
+    parser = argparse.ArgumentParser(description="Build OFFLINE 770-dim features")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--out-x", default=OUTPUT_X)
+    parser.add_argument("--out-y", default=OUTPUT_y)
+    parser.add_argument("--shard-dir", default=None, help="default: <out dir>/shards")
+    parser.add_argument("--shard-size", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--torch-threads", type=int, default=None, help="per worker")
+    parser.add_argument("--no-resume", action="store_true", help="rebuild every shard")
+    args = parser.parse_args()
 
     print("Building OFFLINE 770-dim features...")
 
-    for _, row in tqdm(df.iterrows(), total=len(df)):
-
-        question = row["question"]
-        answer = row["answer"]
-        label = row["label"]
-
-        if pd.isna(question) or pd.isna(answer):
-            continue
-
-        # -------- Module 2 (no LLM)
-        m2 = module2_process(question, answer)
-
-        embedding = extractor.extract(
-            m2["input_ids"],
-            m2["attention_mask"]
-        ).cpu().numpy().flatten()
-
-        # -------- NLI scores (offline)
-        entailment = nli.entailment_score(question, answer)
-        contradiction = nli.contradiction_score(question, answer)
-
-        vector = np.concatenate([
-            embedding,
-            np.array([entailment]),
-            np.array([contradiction])
-        ])
-
-        features.append(vector)
-        labels.append(label)
-
-    X = np.array(features)
-    y = np.array(labels)
-
-    os.makedirs(os.path.dirname(OUTPUT_X), exist_ok=True)
-
-    np.save(OUTPUT_X, X)
-    np.save(OUTPUT_y, y)
+    X_shape, y_shape = build_features(
+        args.input,
+        args.out_x,
+        args.out_y,
+        shard_dir=args.shard_dir,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        torch_threads=args.torch_threads,
+        resume=not args.no_resume
+    )
 
     print("Done.")
-    print("Feature shape:", X.shape)
-    print("Labels shape:", y.shape)
+    print("Feature shape:", X_shape)
+    print("Labels shape:", y_shape)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,369 @@
+# cip/src/classifier/embedding_cache.py
+
+"""
+Persistent, content-addressed cache of DistilBERT CLS embeddings.
+
+Key   = first 16 bytes of sha256(model name, revision, cleaned qa_text)
+Store = one directory per (model, revision) under cip/.cache/embeddings/
+    vectors.bin   append-only rows (float32 or float16), memory-mapped
+    index.bin     append-only 16-byte keys; key i ↔ row i
+    meta.json     dim, dtype, generation (bumped on eviction)
+
+Reads come straight from the memory map (get() returns a read-only view,
+no copy). lookup() hands back the rows together with the memmap they
+index, taken under one lock: eviction swaps in a new file and a new
+memmap, while the old one stays valid for readers still holding it. Appends are guarded by a file lock, so several processes can
+share one store. When the store grows past `max_bytes`, the oldest rows
+are dropped (FIFO) down to 80% of the cap.
+
+Environment:
+  CIP_EMB_CACHE=0             → disable the cache
+  CIP_EMB_CACHE_DIR           → root directory
+  CIP_EMB_CACHE_DTYPE         → float32 (default) or float16
+  CIP_EMB_CACHE_MAX_BYTES     → size cap of vectors.bin per model
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+_CIP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_DIR = os.path.join(_CIP_ROOT, ".cache", "embeddings")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+KEY_BYTES = 16
+
+logger = logging.getLogger("EmbeddingCache")
+
+
+def _slug(name: str) -> str:
+    return name.replace("/", "__").replace(":", "_")
+
+
+class EmbeddingCache:
+    """
+    Memory-mapped embedding store for one (model, revision).
+
+    - lookup() / get() / put_many() by cleaned qa_text
+    - zero-copy reads from the memmap returned by lookup()
+    - size-capped, oldest-first eviction
+    - hit / miss / eviction counters via stats()
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        revision: str = "main",
+        root: str = DEFAULT_DIR,
+        dtype: str = "float32",
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.model_name = model_name
+        self.revision = revision
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.dir = os.path.join(root, f"{_slug(model_name)}@{_slug(revision)}")
+        self._vectors_path = os.path.join(self.dir, "vectors.bin")
+        self._index_path = os.path.join(self.dir, "index.bin")
+        self._meta_path = os.path.join(self.dir, "meta.json")
+        self._lock_path = os.path.join(self.dir, ".lock")
+
+        self._index: dict[bytes, int] = {}
+        self._count = 0
+        self._generation = 0
+        self._mm = None
+
+        self._lock = threading.Lock()
+
+        os.makedirs(self.dir, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._load_meta()
+            self._recover()
+            self._refresh()
+
+    # ---------------------------
+    # Keys
+    # ---------------------------
+    def make_key(self, qa_text: str) -> bytes:
+        payload = "\0".join([self.model_name, self.revision, qa_text])
+        return hashlib.sha256(payload.encode("utf-8")).digest()[:KEY_BYTES]
+
+    # ---------------------------
+    # On-disk state
+    # ---------------------------
+    @contextmanager
+    def _file_lock(self):
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def _load_meta(self) -> None:
+        if not os.path.isfile(self._meta_path):
+            return
+
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+
+        if np.dtype(meta["dtype"]) != self.dtype:
+            logger.info(f"{self.dir}: existing store is {meta['dtype']}, using that")
+
+        self.dtype = np.dtype(meta["dtype"])
+        self.dim = meta["dim"]
+        self._generation = meta.get("generation", 0)
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "model": self.model_name,
+                "revision": self.revision,
+                "dtype": self.dtype.name,
+                "dim": self.dim,
+                "generation": self._generation,
+            }, f)
+        os.replace(tmp, self._meta_path)
+
+    def _recover(self) -> None:
+        """Trim a torn append (crash between the vector and key writes)."""
+        if self.dim is None:
+            return
+
+        n_keys = os.path.getsize(self._index_path) // KEY_BYTES if os.path.isfile(self._index_path) else 0
+        n_rows = os.path.getsize(self._vectors_path) // self._row_bytes() if os.path.isfile(self._vectors_path) else 0
+        rows = min(n_keys, n_rows)
+
+        for path, size in ((self._index_path, rows * KEY_BYTES), (self._vectors_path, rows * self._row_bytes())):
+            if os.path.isfile(path) and os.path.getsize(path) != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _refresh(self) -> None:
+        """Pick up rows appended by other processes (caller holds the locks)."""
+        if os.path.isfile(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta.get("generation", 0) != self._generation or self.dim is None:
+                # Another process evicted/cleared: reload from scratch
+                self._generation = meta.get("generation", 0)
+                self.dim = meta["dim"]
+                self.dtype = np.dtype(meta["dtype"])
+                self._index = {}
+                self._count = 0
+                self._mm = None
+
+        if self.dim is None or not os.path.isfile(self._index_path) or not os.path.isfile(self._vectors_path):
+            return
+
+        n_keys = os.path.getsize(self._index_path) // KEY_BYTES
+        n_rows = os.path.getsize(self._vectors_path) // self._row_bytes()
+        total = min(n_keys, n_rows)
+
+        if total == self._count:
+            return
+
+        with open(self._index_path, "rb") as f:
+            f.seek(self._count * KEY_BYTES)
+            tail = f.read((total - self._count) * KEY_BYTES)
+
+        for i in range(total - self._count):
+            self._index[tail[i * KEY_BYTES:(i + 1) * KEY_BYTES]] = self._count + i
+
+        self._count = total
+        self._mm = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(total, self.dim))
+
+    # ---------------------------
+    # Lookup
+    # ---------------------------
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        Current read-only memmap [rows, dim]. Eviction remaps it, so index
+        the array returned by lookup() rather than this property.
+        """
+        if self._mm is None:
+            return np.zeros((0, self.dim or 0), dtype=self.dtype)
+        return self._mm
+
+    def lookup(self, qa_texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, vectors): row index per text, -1 on a miss, and the
+        read-only memmap those rows index — captured together, so a
+        concurrent eviction cannot remap them.
+        """
+        keys = [self.make_key(t) for t in qa_texts]
+
+        with self._lock:
+            rows = np.array([self._index.get(k, -1) for k in keys], dtype=np.int64)
+
+            if (rows < 0).any():
+                # Maybe another process has them by now
+                with self._file_lock():
+                    self._refresh()
+                rows = np.array([self._index.get(k, -1) for k in keys], dtype=np.int64)
+
+            found = int((rows >= 0).sum())
+            self.hits += found
+            self.misses += len(rows) - found
+
+            vectors = self.vectors
+
+        return rows, vectors
+
+    def get(self, qa_text: str) -> np.ndarray | None:
+        """Zero-copy read-only view of one cached row, or None."""
+        rows, vectors = self.lookup([qa_text])
+        return None if rows[0] < 0 else vectors[rows[0]]
+
+    # ---------------------------
+    # Store
+    # ---------------------------
+    def put_many(self, qa_texts: list[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors)
+        if len(qa_texts) != len(vectors):
+            raise ValueError("qa_texts and vectors must have the same length")
+        if not len(qa_texts):
+            return
+
+        with self._lock, self._file_lock():
+            self._refresh()
+
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._write_meta()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-d vectors, got {vectors.shape[1]}-d")
+
+            keys, rows = [], []
+            seen = set()
+            for text, vec in zip(qa_texts, vectors):
+                key = self.make_key(text)
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                keys.append(key)
+                rows.append(vec)
+
+            if not keys:
+                return
+
+            # Vectors first: a crash leaves extra rows, never dangling keys
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.asarray(rows, dtype=self.dtype).tobytes())
+            with open(self._index_path, "ab") as f:
+                f.write(b"".join(keys))
+
+            self._refresh()
+
+            if self._count * self._row_bytes() > self.max_bytes:
+                self._evict()
+
+    # ---------------------------
+    # Eviction
+    # ---------------------------
+    def _rewrite(self, keep: int) -> None:
+        """Keep only the newest `keep` rows (caller holds the locks)."""
+        dropped = self._count - keep
+
+        vectors = np.array(self._mm[self._count - keep:]) if keep else None
+        with open(self._index_path, "rb") as f:
+            f.seek((self._count - keep) * KEY_BYTES)
+            keys = f.read(keep * KEY_BYTES)
+
+        self._mm = None
+
+        for path, data in ((self._vectors_path, vectors.tobytes() if keep else b""), (self._index_path, keys)):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+        self._generation += 1
+        self._write_meta()
+
+        self._index = {}
+        self._count = 0
+        self._refresh()
+
+        self.evictions += dropped
+
+    def _evict(self) -> None:
+        keep = int(self.max_bytes * 0.8) // self._row_bytes()
+        logger.info(f"{self.dir}: evicting {self._count - keep} oldest rows")
+        self._rewrite(keep)
+
+    def clear(self) -> None:
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._count:
+                self._rewrite(0)
+
+    # ---------------------------
+    # Stats
+    # ---------------------------
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self._count,
+            "bytes": self._count * self._row_bytes() if self.dim else 0,
+            "dtype": self.dtype.name,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# -------------------------------------------------
+# Process-wide instances (one per model + revision)
+# -------------------------------------------------
+_caches: dict[tuple[str, str], EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("CIP_EMB_CACHE", "1").lower() not in ("0", "false", "off", "no")
+
+
+def get_embedding_cache(model_name: str, revision: str = "main") -> EmbeddingCache | None:
+    """Shared cache for (model, revision), or None when disabled via CIP_EMB_CACHE=0."""
+    if not cache_enabled():
+        return None
+
+    with _caches_lock:
+        cache = _caches.get((model_name, revision))
+        if cache is None:
+            cache = _caches[(model_name, revision)] = EmbeddingCache(
+                model_name,
+                revision,
+                root=os.environ.get("CIP_EMB_CACHE_DIR", DEFAULT_DIR),
+                dtype=os.environ.get("CIP_EMB_CACHE_DTYPE", "float32"),
+                max_bytes=int(os.environ.get("CIP_EMB_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            )
+    return cache
@@ -0,0 +1,334 @@
+# cip/src/classifier/feature_builder.py
+
+"""
+Resumable, sharded, multi-process feature builder.
+
+  input CSV (question, answer, label)
+      → shards of `shard_size` rows
+      → process pool (torch threads split between workers)
+      → per shard: clean → tokenize → embed → NLI (see featurize)
+      → shards/shard_00000.X.npy / .y.npy + manifest.json checkpoint
+      → merged into X.npy / y.npy through memory-mapped output
+
+A crash (or Ctrl-C) loses at most the shards in flight: re-running
+skips every shard the manifest marks done. The manifest is tied to the
+input file (size + mtime) and shard size; if either changes, the build
+starts over.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("FeatureBuilder")
+
+MANIFEST = "manifest.json"
+
+
+# -------------------------------------------------
+# Per-shard featurization
+# -------------------------------------------------
+_worker = {}
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Process-pool initializer: cap torch threads, build models once."""
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    from classifier.feature_extractor import DistilBERTFeatureExtractor
+    from negation.nli_scorer import NLIScorer
+
+    _worker["extractor"] = DistilBERTFeatureExtractor()
+    _worker["nli"] = NLIScorer()
+
+
+STAGES = ("clean", "tokenize", "embed", "nli")
+
+
+def featurize(questions: list[str], answers: list[str], timings: dict | None = None) -> np.ndarray:
+    """
+    OFFLINE 770-dim features: [embedding (768), entailment, contradiction].
+
+    Staged, each stage working on the whole shard:
+      clean     → cleaned "question [SEP] answer" texts
+      tokenize  → unpadded token ids for embedding-cache misses only
+                  (one fast-tokenizer call)
+      embed     → [N, 768] (embedding cache, then length-bucketed batches)
+      nli       → [N, 3] from NLIScorer.score_batch — one forward pass
+                  per pair gives both entailment and contradiction
+
+    `timings`, if given, receives seconds per stage.
+    """
+    from preprocessing.module2_preprocess import qa_text, tokenize_batch
+
+    extractor = _worker["extractor"]
+    nli = _worker["nli"]
+    timings = {} if timings is None else timings
+
+    def timed(stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        out = fn(*args, **kwargs)
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+        return out
+
+    qa_texts = timed("clean", lambda: [qa_text(q, a) for q, a in zip(questions, answers)])
+
+    # One cache lookup, shared by the tokenize and embed stages
+    cache = extractor.cache
+    cached = None if cache is None else timed("embed", cache.lookup, qa_texts)
+
+    def tokenize_misses():
+        miss = range(len(qa_texts)) if cached is None else np.flatnonzero(cached[0] < 0)
+        ids = [None] * len(qa_texts)
+        if len(miss):
+            for i, row in zip(miss, tokenize_batch([qa_texts[i] for i in miss])):
+                ids[i] = row
+        return ids
+
+    # Cache hits stay None; extract_texts only reads ids for its misses
+    input_ids = timed("tokenize", tokenize_misses)
+    embeddings = timed("embed", extractor.extract_texts, qa_texts, input_ids=input_ids, cached=cached)
+    scores = timed("nli", nli.score_batch, list(zip(questions, answers)))
+
+    return np.hstack([
+        embeddings.astype(np.float64),
+        scores[:, [nli.entailment_idx, nli.contradiction_idx]].astype(np.float64),
+    ])
+
+
+def _process_shard(shard: dict, questions, answers, labels, shard_dir: str) -> dict:
+    start = time.perf_counter()
+
+    stages = {}
+    X = featurize(questions, answers, stages)
+    y = np.asarray(labels)
+
+    # Write to temp names then rename: a shard file exists only if complete
+    for suffix, array in (("X", X), ("y", y)):
+        path = os.path.join(shard_dir, f"{shard['name']}.{suffix}.npy")
+        tmp = path + ".tmp.npy"
+        np.save(tmp, array)
+        os.replace(tmp, path)
+
+    return {
+        **shard,
+        "done": True,
+        "seconds": round(time.perf_counter() - start, 6),
+        "stages": {k: round(v, 6) for k, v in stages.items()},
+    }
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.1f} rows/s" if seconds > 0 else "n/a"
+
+
+def print_stage_report(manifest: dict) -> None:
+    """Per-stage throughput over every shard timed so far."""
+    timed = [s for s in manifest["shards"] if s.get("stages")]
+    if not timed:
+        return
+
+    rows = sum(s["stop"] - s["start"] for s in timed)
+
+    print("\nStage throughput")
+    print("-------------------------------------------------")
+    for stage in STAGES:
+        seconds = sum(s["stages"].get(stage, 0.0) for s in timed)
+        print(f"{stage:<11} {seconds:9.2f}s  {_rate(rows, seconds)}")
+    total = sum(s["seconds"] for s in timed)
+    print(f"{'shard total':<11} {total:9.2f}s  {_rate(rows, total)}  ({rows} rows, summed over workers)")
+
+
+# -------------------------------------------------
+# Manifest
+# -------------------------------------------------
+def _fingerprint(path: str) -> dict:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime": st.st_mtime}
+
+
+def _load_manifest(shard_dir: str, input_path: str, shard_size: int, rows: int) -> dict:
+    path = os.path.join(shard_dir, MANIFEST)
+    expected = {"input": _fingerprint(input_path), "shard_size": shard_size, "rows": rows}
+
+    if os.path.isfile(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if all(manifest.get(k) == v for k, v in expected.items()):
+            return manifest
+        logger.info("Input or shard size changed — starting a fresh build")
+
+    shards = [
+        {
+            "name": f"shard_{i:05d}",
+            "start": start,
+            "stop": min(start + shard_size, rows),
+            "done": False,
+        }
+        for i, start in enumerate(range(0, rows, shard_size))
+    ]
+    return {**expected, "shards": shards}
+
+
+def _save_manifest(shard_dir: str, manifest: dict) -> None:
+    path = os.path.join(shard_dir, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _shard_complete(shard: dict, shard_dir: str) -> bool:
+    return shard["done"] and all(
+        os.path.isfile(os.path.join(shard_dir, f"{shard['name']}.{s}.npy")) for s in ("X", "y")
+    )
+
+
+# -------------------------------------------------
+# Merge
+# -------------------------------------------------
+def merge_shards(manifest: dict, shard_dir: str, output_X: str, output_y: str) -> tuple:
+    """
+    Concatenate shard outputs into X.npy / y.npy. Output files are
+    memory-mapped and filled shard by shard, so peak memory is one shard.
+    """
+    shards = manifest["shards"]
+
+    first_X = np.load(os.path.join(shard_dir, f"{shards[0]['name']}.X.npy"), mmap_mode="r")
+    first_y = np.load(os.path.join(shard_dir, f"{shards[0]['name']}.y.npy"), mmap_mode="r")
+    rows = manifest["rows"]
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_X)), exist_ok=True)
+
+    X = np.lib.format.open_memmap(output_X, mode="w+", dtype=first_X.dtype, shape=(rows, first_X.shape[1]))
+    y = np.lib.format.open_memmap(output_y, mode="w+", dtype=first_y.dtype, shape=(rows,))
+
+    for shard in shards:
+        X[shard["start"]:shard["stop"]] = np.load(
+            os.path.join(shard_dir, f"{shard['name']}.X.npy"), mmap_mode="r"
+        )
+        y[shard["start"]:shard["stop"]] = np.load(
+            os.path.join(shard_dir, f"{shard['name']}.y.npy"), mmap_mode="r"
+        )
+
+    X.flush()
+    y.flush()
+    return X.shape, y.shape
+
+
+# -------------------------------------------------
+# Driver
+# -------------------------------------------------
+def build_features(
+    input_path: str,
+    output_X: str,
+    output_y: str,
+    shard_dir: str | None = None,
+    shard_size: int = 2048,
+    workers: int = 1,
+    torch_threads: int | None = None,
+    resume: bool = True
+) -> tuple:
+    """
+    Build X / y from a (question, answer, label) CSV.
+
+    workers        processes (each loads its own DistilBERT + NLI)
+    torch_threads  intra-op threads per worker (default: cores // workers)
+    resume=False   ignore completed shards and rebuild everything
+
+    Returns (X.shape, y.shape).
+    """
+    shard_dir = shard_dir or os.path.join(os.path.dirname(os.path.abspath(output_X)), "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    df = pd.read_csv(input_path)
+    df = df.dropna(subset=["question", "answer"]).reset_index(drop=True)
+
+    if df.empty:
+        raise ValueError(f"No usable rows in {input_path}")
+
+    manifest = _load_manifest(shard_dir, input_path, shard_size, len(df))
+    if not resume:
+        for shard in manifest["shards"]:
+            shard["done"] = False
+    _save_manifest(shard_dir, manifest)
+
+    pending = [s for s in manifest["shards"] if not _shard_complete(s, shard_dir)]
+    done = len(manifest["shards"]) - len(pending)
+
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers, len(pending) or 1))
+    torch_threads = torch_threads or max(1, cores // workers)
+
+    print(f"Rows: {len(df)}  Shards: {len(manifest['shards'])}  "
+          f"(done {done}, pending {len(pending)})  "
+          f"Workers: {workers} × {torch_threads} torch threads")
+
+    def payload(shard):
+        part = df.iloc[shard["start"]:shard["stop"]]
+        return (
+            part["question"].tolist(),
+            part["answer"].tolist(),
+            part["label"].tolist(),
+        )
+
+    def finish(result):
+        for i, shard in enumerate(manifest["shards"]):
+            if shard["name"] == result["name"]:
+                manifest["shards"][i] = result
+        _save_manifest(shard_dir, manifest)
+        finished = sum(s["done"] for s in manifest["shards"])
+        rows = result["stop"] - result["start"]
+        stages = "  ".join(f"{k} {_rate(rows, v)}" for k, v in result["stages"].items())
+        print(f"  {result['name']}  {rows} rows in {result['seconds']:.1f}s "
+              f"({_rate(rows, result['seconds'])})  [{finished}/{len(manifest['shards'])}]")
+        print(f"    {stages}")
+
+    failed = []
+
+    if workers == 1:
+        _init_worker(torch_threads)
+        for shard in pending:
+            try:
+                finish(_process_shard(shard, *payload(shard), shard_dir))
+            except Exception as e:
+                logger.error(f"{shard['name']} failed: {e}")
+                failed.append(shard["name"])
+    else:
+        # spawn: torch / tokenizers thread pools do not survive fork
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(torch_threads,)
+        ) as pool:
+            futures = {
+                pool.submit(_process_shard, shard, *payload(shard), shard_dir): shard
+                for shard in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    finish(future.result())
+                except Exception as e:
+                    logger.error(f"{futures[future]['name']} failed: {e}")
+                    failed.append(futures[future]["name"])
+
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} shard(s) failed ({', '.join(sorted(failed))}); re-run to resume"
+        )
+
+    print_stage_report(manifest)
+
+    start = time.perf_counter()
+    shapes = merge_shards(manifest, shard_dir, output_X, output_y)
+    print(f"{'merge':<11} {time.perf_counter() - start:9.2f}s")
+
+    return shapes
@@ -1,9 +1,20 @@
 # cip/src/classifier/feature_extractor.py
 
+import warnings
+
+import numpy as np
 import torch
 import torch.nn.functional as F
 from transformers import DistilBertModel
 
+from classifier.embedding_cache import EmbeddingCache, get_embedding_cache
+from preprocessing.batching import length_buckets, pad_batch
+from registry import model_registry as models
+
+# Max CLS drift (1 - cosine(fp32, int8)) on the TruthfulQA sample before
+# int8 is refused
+MAX_QUANT_DRIFT = 0.01
+
 
 class DistilBERTFeatureExtractor:
     """
@@ -12,30 +23,134 @@ class DistilBERTFeatureExtractor:
     - Uses distilbert-base-uncased
     - Frozen model (no training)
     - Returns L2-normalized CLS embedding (768-d)
+    - extract_batch()/extract_pairs(): many pairs → [N, 768], length-
+      bucketed and padded per batch to its longest item
+    - Embeddings are cached on disk by qa_text (classifier/embedding_cache.py);
+      only misses reach the model. cache=False or CIP_EMB_CACHE=0 disables.
+    - Weights load on first use (shared via the model registry)
+    - backend="onnx" runs the exported graph on ONNX Runtime
+      (see inference/onnx_backend.py)
+    - quantized=True uses int8 dynamic quantization, cached on disk and
+      only enabled if CLS embeddings on a TruthfulQA sample stay within
+      `max_drift` (1 - cosine) of fp32 (see inference/quantization.py)
     """
 
-    def __init__(self, model_name="distilbert-base-uncased"):
+    def __init__(
+        self,
+        model_name="distilbert-base-uncased",
+        backend: str = "torch",
+        quantized: bool = False,
+        max_drift: float = MAX_QUANT_DRIFT,
+        revision: str = "main",
+        cache: bool = True
+    ):
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"backend must be 'torch' or 'onnx', got {backend!r}")
+        if quantized and backend != "torch":
+            raise ValueError("quantized=True is only supported with backend='torch'")
+
         self.device = torch.device("cpu")
+        self.model_name = model_name
+        self.backend = backend
+        self.quantized = quantized
+        self.max_drift = max_drift
+        self.revision = revision
+        self.use_cache = cache
+        # The drift gate decides int8 vs fp32, so it is part of the identity
+        variant = f".int8@{max_drift:g}" if quantized else ""
+        self._registry_key = f"encoder.{backend}{variant}.{model_name}@{revision}"
+
+        models.register(self._registry_key, self._load)
+
+    def _load(self):
+        if self.backend == "onnx":
+            from inference.onnx_backend import OnnxModel
+            return OnnxModel(self.model_name, revision=self.revision)
+
+        if self.quantized:
+            return self._load_quantized()
 
-        self.model = DistilBertModel.from_pretrained(model_name)
-        self.model.to(self.device)
-        self.model.eval()
+        model = DistilBertModel.from_pretrained(self.model_name, revision=self.revision)
+        model.to(self.device)
+        model.eval()
 
         # Freeze parameters
-        for param in self.model.parameters():
+        for param in model.parameters():
             param.requires_grad = False
 
+        return model
+
+    def _load_quantized(self):
+        from transformers import AutoConfig, AutoTokenizer
+        from inference.quantization import load_quantized, truthfulqa_sample
+
+        def load_fp32():
+            return DistilBertModel.from_pretrained(self.model_name, revision=self.revision).eval()
+
+        def build_empty():
+            return DistilBertModel(AutoConfig.from_pretrained(self.model_name, revision=self.revision)).eval()
+
+        @torch.no_grad()
+        def cls_drift(fp32, int8):
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name, revision=self.revision)
+            texts = [f"{q} [SEP] {a}" for q, a in truthfulqa_sample()]
+            worst = 0.0
+            for start in range(0, len(texts), 16):
+                batch = tokenizer(
+                    texts[start:start + 16], truncation=True, max_length=512,
+                    padding=True, return_tensors="pt"
+                )
+                ref = F.normalize(fp32(**batch).last_hidden_state[:, 0, :], dim=1)
+                new = F.normalize(int8(**batch).last_hidden_state[:, 0, :], dim=1)
+                worst = max(worst, float(1 - (ref * new).sum(dim=1).min()))
+            return worst
+
+        model, quantized = load_quantized(
+            self.model_name, load_fp32, build_empty, cls_drift,
+            self.max_drift, metric="max_cls_cosine_distance", revision=self.revision
+        )
+        if not quantized:
+            # Gate refused int8: place the fp32 model like the plain path
+            model.to(self.device)
+
+        for param in model.parameters():
+            param.requires_grad = False
+
+        return model
+
+    @property
+    def model(self):
+        return models.get(self._registry_key)
+
+    @property
+    def cache(self) -> EmbeddingCache | None:
+        if not self.use_cache:
+            return None
+        # int8 / ONNX embeddings differ slightly from fp32: separate stores
+        variant = self.backend + ("-int8" if self.quantized else "")
+        name = self.model_name if variant == "torch" else f"{self.model_name}:{variant}"
+        return get_embedding_cache(name, self.revision)
+
     @torch.no_grad()
-    def extract(self, input_ids, attention_mask):
+    def extract(self, input_ids, attention_mask, qa_text: str | None = None):
         """
         Inputs:
             input_ids: [1, seq_len]
             attention_mask: [1, seq_len]
+            qa_text: cleaned QA text (module2_process "qa_text") — enables
+                     the embedding cache
 
         Returns:
-            embedding: tensor shape [1, 768]
+            embedding: tensor shape [1, 768] (a read-only view of the
+                       memory map on a float32 cache hit)
         """
 
+        cache = self.cache if qa_text is not None else None
+        if cache is not None:
+            cached = cache.get(qa_text)
+            if cached is not None:
+                return _as_tensor(cached)[None, :]
+
         input_ids = input_ids.to(self.device)
         attention_mask = attention_mask.to(self.device)
 
@@ -50,4 +165,113 @@ class DistilBERTFeatureExtractor:
         # L2 normalize (important for stability)
         normalized = F.normalize(cls_embedding, p=2, dim=1)
 
+        if cache is not None:
+            cache.put_many([qa_text], normalized.cpu().numpy())
+
         return normalized
+
+    # -------------------------------------------------
+    # Batched API
+    # -------------------------------------------------
+    @torch.no_grad()
+    def extract_batch(
+        self,
+        input_ids: list[list[int]],
+        batch_size: int = 32,
+        max_tokens: int | None = 8192
+    ) -> np.ndarray:
+        """
+        Inputs:
+            input_ids: unpadded token id lists (module2_process_batch)
+
+        Returns:
+            embeddings: float32 array [N, 768], aligned with input_ids
+        """
+        model = self.model
+        pad_id = model.config.pad_token_id or 0
+        out = np.zeros((len(input_ids), model.config.hidden_size), dtype=np.float32)
+
+        lengths = [len(ids) for ids in input_ids]
+
+        for idx in length_buckets(lengths, batch_size, max_tokens):
+            ids, mask = pad_batch([input_ids[i] for i in idx], pad_id)
+
+            outputs = model(
+                input_ids=torch.from_numpy(ids).to(self.device),
+                attention_mask=torch.from_numpy(mask).to(self.device)
+            )
+
+            cls_embedding = outputs.last_hidden_state[:, 0, :]
+            out[idx] = F.normalize(cls_embedding, p=2, dim=1).float().cpu().numpy()
+
+        return out
+
+    def extract_texts(
+        self,
+        qa_texts: list[str],
+        batch_size: int = 32,
+        input_ids: list[list[int]] | None = None,
+        cached: tuple[np.ndarray, np.ndarray] | None = None
+    ) -> np.ndarray:
+        """
+        Cleaned QA texts → float32 [N, 768].
+        Cache hits are read from the memory map; only misses are
+        tokenized and run through the model, then appended to the cache.
+        Pass `input_ids` (aligned with qa_texts) if already tokenized;
+        None entries are tokenized here. Pass `cached`, the result of
+        cache.lookup(qa_texts), if the caller already looked them up.
+
+        If every row hits a float32 cache and the rows are stored
+        contiguously, the result is a read-only view of the memory map
+        (no copy). Otherwise it is a new array.
+        """
+        from preprocessing.module2_preprocess import tokenize_batch
+
+        def ids_for(indices):
+            ids = [None] * len(indices) if input_ids is None else [input_ids[i] for i in indices]
+            todo = [j for j, x in enumerate(ids) if x is None]
+            if todo:
+                for j, x in zip(todo, tokenize_batch([qa_texts[indices[j]] for j in todo])):
+                    ids[j] = x
+            return ids
+
+        cache = self.cache
+        if cache is None:
+            return self.extract_batch(ids_for(range(len(qa_texts))), batch_size)
+
+        rows, cached = cache.lookup(qa_texts) if cached is None else cached
+        hit = rows >= 0
+
+        if len(rows) and hit.all() and cached.dtype == np.float32 and (np.diff(rows) == 1).all():
+            return cached[rows[0]:rows[-1] + 1]
+
+        # All hits → the model is never loaded
+        dim = cached.shape[1] if hit.all() and cached.shape[1] else self.model.config.hidden_size
+        out = np.zeros((len(qa_texts), dim), dtype=np.float32)
+
+        if hit.any():
+            out[hit] = cached[rows[hit]]
+
+        miss = np.flatnonzero(~hit).tolist()
+        if miss:
+            vectors = self.extract_batch(ids_for(miss), batch_size)
+            out[miss] = vectors
+            cache.put_many([qa_texts[i] for i in miss], vectors)
+
+        return out
+
+    def extract_pairs(self, pairs: list[tuple[str, str]], batch_size: int = 32) -> np.ndarray:
+        """(question, answer) pairs → float32 [N, 768] (Module 2 + Module 5)."""
+        from preprocessing.module2_preprocess import qa_text
+
+        return self.extract_texts([qa_text(q, a) for q, a in pairs], batch_size)
+
+
+def _as_tensor(row: np.ndarray) -> torch.Tensor:
+    """Cached row → tensor; shares memory with the memmap when float32."""
+    if row.dtype != np.float32:
+        return torch.from_numpy(row.astype(np.float32))
+    with warnings.catch_warnings():
+        # The memmap is read-only; callers only read embeddings
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(row)
@@ -10,6 +10,8 @@ from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 
+from explainability.background import build_explainer_state
+
 
 # -------------------------------------------------
 # Load Features
@@ -92,4 +94,13 @@ print(confusion_matrix(y_test, preds))
 
 joblib.dump(model, "../data/processed/hallucination_model.pkl")
 
-print("\nCalibrated model saved successfully.")
\ No newline at end of file
+print("\nCalibrated model saved successfully.")
+
+
+# -------------------------------------------------
+# Explainer state (background summary + LIME stats)
+# -------------------------------------------------
+
+summary = build_explainer_state(X, y, "../data/processed")
+
+print(f"Explainer background saved ({summary['background_rows']} rows summarizing {summary['rows']}).")
\ No newline at end of file
@@ -0,0 +1,216 @@
+# cip/src/explainability/background.py
+
+"""
+Summarized explainer background + persisted LIME statistics.
+
+Instead of handing the whole X.npy to the explainers on every start:
+
+  • background  — k weighted rows (k-means centers or a stratified
+                  sample), saved as .npy and loaded memory-mapped
+  • LIME stats  — the quartile discretizer statistics LIME would compute
+                  over the full X (bins, per-bin means/stds/mins/maxs,
+                  bin frequencies), passed as `training_data_stats`
+
+Both are computed once (after training) from a memory-mapped X, in
+column/row chunks, and stored next to hallucination_model.pkl:
+
+    explainer_background.npy
+    explainer_background_weights.npy
+    lime_stats.joblib
+
+    python -m explainability.background --method kmeans --k 100
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger("ExplainerBackground")
+
+BACKGROUND_FILE = "explainer_background.npy"
+WEIGHTS_FILE = "explainer_background_weights.npy"
+LIME_STATS_FILE = "lime_stats.joblib"
+
+# Rows per chunk when streaming over a memory-mapped X
+_CHUNK_ROWS = 8192
+# Columns per chunk for the per-feature LIME statistics
+_CHUNK_COLS = 64
+
+
+# -------------------------------------------------
+# Background summary
+# -------------------------------------------------
+def _kmeans(X: np.ndarray, k: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    from sklearn.cluster import MiniBatchKMeans
+
+    k = min(k, len(X))
+    km = MiniBatchKMeans(n_clusters=k, random_state=seed, batch_size=min(_CHUNK_ROWS, len(X)), n_init=3)
+
+    # partial_fit over chunks: X stays on disk
+    for _ in range(3):
+        for start in range(0, len(X), _CHUNK_ROWS):
+            chunk = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+            if len(chunk) >= k:
+                km.partial_fit(chunk)
+
+    if not hasattr(km, "cluster_centers_"):
+        # Fewer rows than one usable chunk
+        km.fit(np.asarray(X, dtype=np.float64))
+
+    counts = np.zeros(k, dtype=np.float64)
+    for start in range(0, len(X), _CHUNK_ROWS):
+        labels = km.predict(np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64))
+        counts += np.bincount(labels, minlength=k)
+
+    used = counts > 0
+    return km.cluster_centers_[used], counts[used]
+
+
+def _stratified(X: np.ndarray, y: np.ndarray | None, k: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    y = np.zeros(len(X), dtype=int) if y is None else np.asarray(y)
+
+    rows, weights = [], []
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        # Per-class quota proportional to class size (at least one row)
+        quota = max(1, round(k * len(members) / len(X)))
+        take = np.sort(rng.choice(members, min(quota, len(members)), replace=False))
+        rows.append(take)
+        weights.append(np.full(len(take), len(members) / len(take)))
+
+    idx = np.concatenate(rows)
+    order = np.argsort(idx)
+    return np.asarray(X[idx[order]], dtype=np.float64), np.concatenate(weights)[order]
+
+
+def summarize_background(
+    X: np.ndarray,
+    y: np.ndarray | None = None,
+    k: int = 100,
+    method: str = "kmeans",
+    seed: int = 42
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (rows [m, d] float64, weights [m]) with m ≤ k.
+    Weights are the number of training rows each summary row stands for.
+    """
+    if method == "kmeans":
+        return _kmeans(X, k, seed)
+    if method == "stratified":
+        return _stratified(X, y, k, seed)
+    raise ValueError(f"method must be 'kmeans' or 'stratified', got {method!r}")
+
+
+# -------------------------------------------------
+# LIME statistics (same as LIME's QuartileDiscretizer on the full X)
+# -------------------------------------------------
+def lime_training_stats(X: np.ndarray) -> dict:
+    """`training_data_stats` for LimeTabularExplainer(discretize_continuous=True)."""
+    stats = {key: {} for key in ("means", "stds", "mins", "maxs", "bins", "feature_values", "feature_frequencies")}
+
+    for col_start in range(0, X.shape[1], _CHUNK_COLS):
+        block = np.asarray(X[:, col_start:col_start + _CHUNK_COLS], dtype=np.float64)
+
+        for j in range(block.shape[1]):
+            feature = col_start + j
+            column = block[:, j]
+
+            qts = np.unique(np.percentile(column, [25, 50, 75]))
+            discretized = np.searchsorted(qts, column)
+
+            means, stds = [], []
+            for b in range(len(qts) + 1):
+                selection = column[discretized == b]
+                means.append(0 if len(selection) == 0 else np.mean(selection))
+                stds.append((0 if len(selection) == 0 else np.std(selection)) + 0.00000000001)
+
+            values, counts = np.unique(discretized, return_counts=True)
+
+            stats["bins"][feature] = qts
+            stats["means"][feature] = means
+            stats["stds"][feature] = stds
+            stats["mins"][feature] = [column.min()] + qts.tolist()
+            stats["maxs"][feature] = qts.tolist() + [column.max()]
+            stats["feature_values"][feature] = values.tolist()
+            stats["feature_frequencies"][feature] = counts.tolist()
+
+    return stats
+
+
+# -------------------------------------------------
+# Persisted state
+# -------------------------------------------------
+def build_explainer_state(
+    X: np.ndarray,
+    y: np.ndarray | None,
+    out_dir: str,
+    k: int = 100,
+    method: str = "kmeans",
+    seed: int = 42
+) -> dict:
+    """Compute and save background summary + LIME stats into out_dir."""
+    start = time.perf_counter()
+
+    background, weights = summarize_background(X, y, k, method, seed)
+    stats = lime_training_stats(X)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, BACKGROUND_FILE), background)
+    np.save(os.path.join(out_dir, WEIGHTS_FILE), weights)
+    joblib.dump(
+        {"stats": stats, "rows": int(len(X)), "method": method, "k": int(len(background))},
+        os.path.join(out_dir, LIME_STATS_FILE)
+    )
+
+    summary = {
+        "rows": int(len(X)),
+        "background_rows": int(len(background)),
+        "method": method,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    logger.info(f"Explainer state saved to {out_dir}: {summary}")
+    return summary
+
+
+def has_explainer_state(state_dir: str) -> bool:
+    return all(
+        os.path.isfile(os.path.join(state_dir, f))
+        for f in (BACKGROUND_FILE, WEIGHTS_FILE, LIME_STATS_FILE)
+    )
+
+
+def load_explainer_state(state_dir: str) -> tuple[np.ndarray, np.ndarray, dict]:
+    """(background memmap, weights, LIME training_data_stats)."""
+    background = np.load(os.path.join(state_dir, BACKGROUND_FILE), mmap_mode="r")
+    weights = np.load(os.path.join(state_dir, WEIGHTS_FILE))
+    stats = joblib.load(os.path.join(state_dir, LIME_STATS_FILE))["stats"]
+    return background, weights, stats
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build summarized explainer background + LIME stats")
+    parser.add_argument("--x", default="../data/processed/X.npy")
+    parser.add_argument("--y", default="../data/processed/y.npy")
+    parser.add_argument("--out-dir", default="../data/processed")
+    parser.add_argument("--method", choices=["kmeans", "stratified"], default="kmeans")
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    X = np.load(args.x, mmap_mode="r")
+    y = np.load(args.y) if os.path.isfile(args.y) else None
+
+    summary = build_explainer_state(X, y, args.out_dir, args.k, args.method, args.seed)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ import joblib
 import logging
 
 from lime.lime_tabular import LimeTabularExplainer
-from fusion.fusion_layer import fuse_prediction
+from fusion.fusion_layer import fuse_prediction_batch
 
 logger = logging.getLogger("CIPExplainer")
 
@@ -31,7 +31,17 @@ class CIPExplainer:
     the prediction toward hallucination (positive) or factual (negative).
     """
 
-    def __init__(self, model_path: str, X_background: np.ndarray):
+    def __init__(
+        self,
+        model_path: str,
+        X_background: np.ndarray,
+        training_data_stats: dict | None = None
+    ):
+        """
+        training_data_stats: precomputed discretizer statistics
+        (explainability/background.py). With them, X_background can be a
+        small summary and LIME skips recomputing stats over all rows.
+        """
         self.model = joblib.load(model_path)
 
         self.explainer = LimeTabularExplainer(
@@ -41,22 +51,28 @@ class CIPExplainer:
             class_names=["Factual", "Hallucination"],
             discretize_continuous=True,
             random_state=42,
+            training_data_stats=training_data_stats,
         )
 
+    @classmethod
+    def from_state(cls, model_path: str, state_dir: str) -> "CIPExplainer":
+        """Build from the persisted background summary + LIME stats."""
+        from explainability.background import load_explainer_state
+
+        background, _, stats = load_explainer_state(state_dir)
+        return cls(model_path, background, training_data_stats=stats)
+
     # --------------------------------------------------
     # LIME-compatible prediction wrapper (model + fusion)
     # --------------------------------------------------
     def _predict_with_fusion(self, X: np.ndarray) -> np.ndarray:
         probs = self.model.predict_proba(X)[:, 1]
 
-        fused = np.array([
-            fuse_prediction(
-                p_model=float(probs[i]),
-                consistency_score=float(X[i, _CONSISTENCY_IDX]),
-                negation_score=float(X[i, _NEGATION_IDX]),
-            )
-            for i in range(len(X))
-        ])
+        fused = fuse_prediction_batch(
+            p_model=probs,
+            consistency_score=X[:, _CONSISTENCY_IDX],
+            negation_score=X[:, _NEGATION_IDX],
+        )
 
         return np.vstack([1 - fused, fused]).T
 
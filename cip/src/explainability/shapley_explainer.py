@@ -0,0 +1,146 @@
+# cip/src/explainability/shapley_explainer.py
+
+import itertools
+import logging
+from math import factorial
+
+import joblib
+import numpy as np
+
+from fusion.fusion_layer import fuse_prediction_batch
+from explainability.lime_explainer import _EMB_END, _CONSISTENCY_IDX, _NEGATION_IDX
+
+logger = logging.getLogger("GroupShapleyExplainer")
+
+# Player → feature columns
+_GROUPS = {
+    "Embedding": np.arange(_EMB_END),
+    "Consistency": np.array([_CONSISTENCY_IDX]),
+    "Negation": np.array([_NEGATION_IDX]),
+}
+_PLAYERS = list(_GROUPS)
+
+
+class GroupShapleyExplainer:
+    """
+    Exact grouped Shapley attribution for the CIP pipeline.
+
+    Three players — Embedding (768 dims), Consistency, Negation — so the
+    exact Shapley values need only the 2³ = 8 coalition values:
+
+      v(S) = E_b[ f(x_S, b_rest) ]   over the background summary b
+
+    where f = classifier + adaptive fusion (same as the LIME wrapper).
+    All 8 × len(background) rows go through one predict_proba call.
+
+    - Deterministic (no sampling)
+    - Efficiency: the three values sum to f(x) − v(∅)
+    - Same output keys as CIPExplainer.explain_instance
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        X_background: np.ndarray,
+        background_weights: np.ndarray | None = None,
+        max_background: int = 100,
+        seed: int = 42
+    ):
+        self.model = joblib.load(model_path)
+
+        X_background = np.asarray(X_background)
+        if background_weights is None and len(X_background) > max_background:
+            # Plain uniform subsample; pass a weighted summary to do better
+            idx = np.random.default_rng(seed).choice(len(X_background), max_background, replace=False)
+            X_background = X_background[np.sort(idx)]
+
+        self.background = np.asarray(X_background, dtype=np.float64)
+
+        if background_weights is None:
+            background_weights = np.ones(len(self.background))
+        weights = np.asarray(background_weights, dtype=np.float64)
+        self.weights = weights / weights.sum()
+
+        # Coalitions as boolean masks over players, in a fixed order
+        self._coalitions = list(itertools.product([False, True], repeat=len(_PLAYERS)))
+
+    @classmethod
+    def from_state(cls, model_path: str, state_dir: str) -> "GroupShapleyExplainer":
+        """Use the persisted (memory-mapped) weighted background summary."""
+        from explainability.background import load_explainer_state
+
+        background, weights, _ = load_explainer_state(state_dir)
+        return cls(model_path, background, background_weights=weights)
+
+    # --------------------------------------------------
+    # Model + fusion (same as CIPExplainer._predict_with_fusion)
+    # --------------------------------------------------
+    def _risk(self, X: np.ndarray) -> np.ndarray:
+        probs = self.model.predict_proba(X)[:, 1]
+        return fuse_prediction_batch(
+            p_model=probs,
+            consistency_score=X[:, _CONSISTENCY_IDX],
+            negation_score=X[:, _NEGATION_IDX],
+        )
+
+    def coalition_values(self, instance: np.ndarray) -> dict:
+        """{coalition (tuple of player names): v(S)} for all 8 coalitions."""
+        instance = np.asarray(instance, dtype=np.float64).flatten()
+        n_bg = len(self.background)
+
+        rows = np.tile(self.background, (len(self._coalitions), 1))
+        for c, mask in enumerate(self._coalitions):
+            block = slice(c * n_bg, (c + 1) * n_bg)
+            for player, present in zip(_PLAYERS, mask):
+                if present:
+                    rows[block, _GROUPS[player]] = instance[_GROUPS[player]]
+
+        risk = self._risk(rows).reshape(len(self._coalitions), n_bg)
+        values = risk @ self.weights
+
+        return {
+            tuple(p for p, present in zip(_PLAYERS, mask) if present): float(v)
+            for mask, v in zip(self._coalitions, values)
+        }
+
+    # --------------------------------------------------
+    # Main entry point
+    # --------------------------------------------------
+    def explain_instance(self, instance: np.ndarray, **_) -> dict:
+        """
+        Explain a single 770-d feature vector.
+
+        Returns dict with:
+          embedding_signal   – Shapley value of the embedding group
+          consistency_signal – Shapley value of the consistency feature
+          negation_signal    – Shapley value of the negation feature
+          dominant_signal    – name of the strongest contributor
+          base_value         – v(∅), mean risk over the background
+          prediction         – f(x), fused risk for the instance
+          coalition_values   – v(S) for all 8 coalitions
+        """
+        values = self.coalition_values(instance)
+        n = len(_PLAYERS)
+
+        shapley = {}
+        for player in _PLAYERS:
+            others = [p for p in _PLAYERS if p != player]
+            phi = 0.0
+            for size in range(n):
+                weight = factorial(size) * factorial(n - size - 1) / factorial(n)
+                for subset in itertools.combinations(others, size):
+                    with_player = tuple(p for p in _PLAYERS if p in subset or p == player)
+                    phi += weight * (values[with_player] - values[subset])
+            shapley[player] = phi
+
+        dominant = max(shapley, key=lambda p: abs(shapley[p]))
+
+        return {
+            "embedding_signal": round(shapley["Embedding"], 4),
+            "consistency_signal": round(shapley["Consistency"], 4),
+            "negation_signal": round(shapley["Negation"], 4),
+            "dominant_signal": dominant,
+            "base_value": round(values[()], 4),
+            "prediction": round(values[tuple(_PLAYERS)], 4),
+            "coalition_values": {"+".join(k) or "∅": round(v, 4) for k, v in values.items()},
+        }
@@ -12,8 +12,14 @@ Signals:
   • p_model       — Embedding model probability (from classifier)
   • consistency   — Rephrase consistency score (Module 3)
   • negation      — Negation contradiction score (Module 4)
+
+The *_batch functions are numpy versions of the scalar ones for many
+rows at once (LIME perturbations, offline scoring). They perform the
+same float64 operations in the same order, so results are identical.
 """
 
+import numpy as np
+
 # -------------------------------------------------
 # Base weights (prior/default)
 # -------------------------------------------------
@@ -21,6 +27,10 @@ BASE_ALPHA = 0.50   # embedding
 BASE_BETA  = 0.30  # consistency
 BASE_GAMMA = 0.20   # negation
 
+# Consistency below these gets a strong / moderate weight boost
+CONSISTENCY_STRONG = 0.3
+CONSISTENCY_MODERATE = 0.5
+
 
 def _compute_adaptive_weights(
     p_model: float,
@@ -54,9 +64,9 @@ def _compute_adaptive_weights(
 
     # ── Consistency boost ──
     # Low consistency = LLM gave different answers to same question
-    if consistency_score < 0.3:
+    if consistency_score < CONSISTENCY_STRONG:
         beta += 0.20  # strong signal — heavily boost
-    elif consistency_score < 0.5:
+    elif consistency_score < CONSISTENCY_MODERATE:
         beta += 0.10  # moderate signal
 
     # ── Negation boost ──
@@ -173,4 +183,120 @@ def decompose_prediction(
             "beta": round(beta, 3),
             "gamma": round(gamma, 3),
         },
-    }
\ No newline at end of file
+    }
+
+
+# -------------------------------------------------
+# Vectorized (numpy) API
+# -------------------------------------------------
+_SIGNALS = np.array(["Embedding", "Consistency", "Negation"])
+
+
+def _as_scores(values) -> np.ndarray:
+    """float64 array; None entries → 0.0 (same as the scalar safety check)."""
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        arr = np.where(arr == None, 0.0, arr)  # noqa: E711 — elementwise None test
+    return arr.astype(np.float64)
+
+
+def _compute_adaptive_weights_batch(
+    p_model: np.ndarray,
+    consistency_score: np.ndarray,
+    negation_score: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized _compute_adaptive_weights (same thresholds and order of operations)."""
+    model_confidence = np.abs(p_model - 0.5) * 2
+    alpha = BASE_ALPHA + 0.15 * model_confidence
+
+    beta = np.where(
+        consistency_score < CONSISTENCY_STRONG, BASE_BETA + 0.20,
+        np.where(consistency_score < CONSISTENCY_MODERATE, BASE_BETA + 0.10, BASE_BETA)
+    )
+
+    gamma = np.where(
+        negation_score > 0.6, BASE_GAMMA + 0.20,
+        np.where(negation_score > 0.4, BASE_GAMMA + 0.10, BASE_GAMMA)
+    )
+
+    total = alpha + beta + gamma
+    return alpha / total, beta / total, gamma / total
+
+
+def fuse_prediction_batch(p_model, consistency_score, negation_score) -> np.ndarray:
+    """
+    fuse_prediction for arrays (broadcast against each other).
+
+    Returns float64 hallucination risk per row.
+    """
+    p_model, consistency_score, negation_score = np.broadcast_arrays(
+        _as_scores(p_model), _as_scores(consistency_score), _as_scores(negation_score)
+    )
+
+    alpha, beta, gamma = _compute_adaptive_weights_batch(
+        p_model, consistency_score, negation_score
+    )
+
+    return (
+        alpha * p_model
+        + beta * (1 - consistency_score)
+        + gamma * negation_score
+    )
+
+
+def decompose_prediction_batch(p_model, consistency_score, negation_score) -> dict:
+    """
+    decompose_prediction for arrays.
+
+    Same keys as decompose_prediction, with one array entry per row.
+    Values are not rounded: decompose_prediction() equals these passed
+    through round() (3 places for weights, 4 for contributions,
+    1 for percentages).
+    """
+    p_model, consistency_score, negation_score = np.broadcast_arrays(
+        _as_scores(p_model), _as_scores(consistency_score), _as_scores(negation_score)
+    )
+
+    alpha, beta, gamma = _compute_adaptive_weights_batch(
+        p_model, consistency_score, negation_score
+    )
+
+    emb_contrib = alpha * p_model
+    con_contrib = beta * (1 - consistency_score)
+    neg_contrib = gamma * negation_score
+    total = emb_contrib + con_contrib + neg_contrib
+
+    positive = total > 0
+    safe_total = np.where(positive, total, 1.0)
+    emb_pct = np.where(positive, emb_contrib / safe_total * 100, 33.3)
+    con_pct = np.where(positive, con_contrib / safe_total * 100, 33.3)
+    neg_pct = np.where(positive, neg_contrib / safe_total * 100, 33.3)
+
+    # argmax keeps the first maximum — same tie-break as max() over the dict
+    contributions = np.stack([np.abs(emb_contrib), np.abs(con_contrib), np.abs(neg_contrib)])
+    dominant = _SIGNALS[np.argmax(contributions, axis=0)]
+
+    return {
+        "final_risk": total,
+        "embedding": {
+            "weight": alpha,
+            "contribution": emb_contrib,
+            "percentage": emb_pct,
+        },
+        "consistency": {
+            "weight": beta,
+            "contribution": con_contrib,
+            "percentage": con_pct,
+        },
+        "negation": {
+            "weight": gamma,
+            "contribution": neg_contrib,
+            "percentage": neg_pct,
+        },
+        "dominant_signal": dominant,
+        "weights_used": {
+            "alpha": alpha,
+            "beta": beta,
+            "gamma": gamma,
+        },
+    }
@@ -11,6 +11,7 @@ import streamlit as st
 import plotly.graph_objects as go
 
 from run_pipeline import run_cip_pipeline
+from llm_interface.real_llm import stream_answer
 
 # -------------------------------------------------
 # Page Config
@@ -724,16 +725,23 @@ if prompt := st.chat_input("Ask me anything… I'll answer and check for halluci
     # Run pipeline
     with st.chat_message("assistant", avatar="🛡️"):
         try:
-            with st.spinner("🔍 Analyzing with Consistency–Inference–Probe framework…"):
-                result = run_cip_pipeline(prompt)
-
-            # Assistant answer bubble
-            answer_text = result["answer"]
-            st.markdown(
+            # Assistant answer bubble — rendered token by token
+            answer_slot = st.empty()
+            answer_text = ""
+            for delta in stream_answer(prompt):
+                answer_text += delta
+                answer_slot.markdown(
+                    f'<div class="assistant-bubble">{answer_text}▌</div>',
+                    unsafe_allow_html=True,
+                )
+            answer_slot.markdown(
                 f'<div class="assistant-bubble">{answer_text}</div>',
                 unsafe_allow_html=True,
             )
 
+            with st.spinner("🔍 Analyzing with Consistency–Inference–Probe framework…"):
+                result = run_cip_pipeline(prompt, answer=answer_text)
+
             # Full analysis
             render_analysis(result)
 
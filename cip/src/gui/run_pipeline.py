@@ -12,53 +12,88 @@ sys.path.append(PROJECT_ROOT)
 # Imports
 # -------------------------------------------------
 
+import asyncio
 import logging
+import threading
 import numpy as np
 import joblib
 
-from llm_interface.real_llm import llm_answer
+from llm_interface.real_llm import llm_answer, submit
 from preprocessing.module2_preprocess import module2_process
 from classifier.feature_extractor import DistilBERTFeatureExtractor
 from rephrase.module3.rephrase_consistency import RephraseConsistencyAnalyzer
 from negation.negation_probe import NegationProbe
+from negation.nli_scorer import NLIScorer
 from fusion.fusion_layer import fuse_prediction, decompose_prediction
 from explainability.lime_explainer import CIPExplainer
+from explainability.shapley_explainer import GroupShapleyExplainer
+from explainability.background import build_explainer_state, has_explainer_state
+from registry import model_registry as models
 
 logger = logging.getLogger("CIPPipeline")
 
 DATA_DIR = os.path.join(os.path.dirname(PROJECT_ROOT), "data", "processed")
 MODEL_PATH = os.path.join(DATA_DIR, "hallucination_model.pkl")
 BACKGROUND_PATH = os.path.join(DATA_DIR, "X.npy")
-_model = None
-_explainer = None
 
 
-def _get_model():
-    """Lazy-load model; returns None if file missing."""
-    global _model
-    if _model is not None:
-        return _model
+def _load_model():
+    """Returns None if file missing."""
     if os.path.isfile(MODEL_PATH):
-        _model = joblib.load(MODEL_PATH)
-        return _model
+        return joblib.load(MODEL_PATH)
     return None
 
 
-def _get_explainer():
-    """Lazy-load LIME explainer; returns None if model/data missing."""
-    global _explainer
-    if _explainer is not None:
-        return _explainer
-    if os.path.isfile(MODEL_PATH) and os.path.isfile(BACKGROUND_PATH):
-        try:
-            X_bg = np.load(BACKGROUND_PATH)
-            _explainer = CIPExplainer(MODEL_PATH, X_bg)
-            return _explainer
-        except Exception as e:
-            logger.warning(f"Could not load LIME explainer: {e}")
+# CIP_EXPLAINER=shapley → exact grouped Shapley (8 coalitions) instead of LIME
+EXPLAINER = os.environ.get("CIP_EXPLAINER", "lime").lower()
+_EXPLAINER_KEY = f"explainer.{EXPLAINER}"
+
+
+def _load_explainer():
+    """
+    Returns None if model/data missing.
+    Uses the summarized background + LIME stats saved next to the model,
+    building them once (from a memory-mapped X.npy) if absent.
+    """
+    if not os.path.isfile(MODEL_PATH):
+        return None
+
+    try:
+        if not has_explainer_state(DATA_DIR):
+            if not os.path.isfile(BACKGROUND_PATH):
+                return None
+            logger.info("No explainer state found — summarizing X.npy once")
+            build_explainer_state(np.load(BACKGROUND_PATH, mmap_mode="r"), None, DATA_DIR)
+
+        if EXPLAINER == "shapley":
+            return GroupShapleyExplainer.from_state(MODEL_PATH, DATA_DIR)
+        return CIPExplainer.from_state(MODEL_PATH, DATA_DIR)
+    except Exception as e:
+        logger.warning(f"Could not load {EXPLAINER} explainer: {e}")
     return None
 
 
+models.register("classifier.hallucination_model", _load_model)
+models.register(_EXPLAINER_KEY, _load_explainer)
+
+
+def _get_model():
+    """Lazy-load model; returns None if file missing."""
+    model = models.get("classifier.hallucination_model")
+    if model is None:
+        # Not trained yet — look again on the next request
+        models.unload("classifier.hallucination_model")
+    return model
+
+
+def _get_explainer():
+    """Lazy-load the explainer; returns None if model/data missing."""
+    explainer = models.get(_EXPLAINER_KEY)
+    if explainer is None:
+        models.unload(_EXPLAINER_KEY)
+    return explainer
+
+
 def _generate_why_explanation(
     prediction: str,
     consistency: float,
@@ -111,12 +146,60 @@ def _generate_why_explanation(
             )
 
 
-extractor = DistilBERTFeatureExtractor()
-m3 = RephraseConsistencyAnalyzer(num_paraphrases=1)
-m4 = NegationProbe()
+# CIP_QUANTIZED=1 → int8 DistilBERT + NLI (each falls back to fp32 if
+# its accuracy gate fails)
+QUANTIZED = os.environ.get("CIP_QUANTIZED", "0") == "1"
+
+# Cheap to construct — model weights load on first use (or warm_up_pipeline)
+extractor = DistilBERTFeatureExtractor(quantized=QUANTIZED)
+
+# CIP_PARAPHRASER=rules → local spaCy paraphrases instead of an LLM call
+# (default for every request; run_cip_pipeline(..., paraphraser=) overrides)
+PARAPHRASER = os.environ.get("CIP_PARAPHRASER", "llm").lower()
+if PARAPHRASER not in ("llm", "rules"):
+    logger.warning(f"Unknown CIP_PARAPHRASER={PARAPHRASER!r}; using 'llm'")
+    PARAPHRASER = "llm"
+
+m3 = RephraseConsistencyAnalyzer(num_paraphrases=3, adaptive=True, paraphraser=PARAPHRASER)
+m4 = NegationProbe(NLIScorer(quantized=QUANTIZED))
+
+
+def warm_up_pipeline(parallel: bool = True, report: bool = True) -> dict:
+    """
+    Load every registered model now (in parallel threads by default)
+    instead of on the first request.
+    """
+    timings = models.warm_up(parallel=parallel)
+    if report:
+        models.print_startup_report()
+    return timings
+
+
+# CIP_WARMUP=1 → start loading everything in the background at import
+if os.environ.get("CIP_WARMUP", "0") == "1":
+    threading.Thread(
+        target=warm_up_pipeline, kwargs={"report": False}, name="cip-warmup", daemon=True
+    ).start()
 
 
-def run_cip_pipeline(question: str) -> dict:
+async def _run_probes(question: str, answer: str, paraphraser: str | None = None) -> tuple[dict, dict]:
+    """Modules 3 and 4 are independent — fan their LLM calls out together."""
+    m3_out, m4_out = await asyncio.gather(
+        m3.arun(question, answer, paraphraser=paraphraser),
+        m4.arun(question, answer),
+    )
+    return m3_out, m4_out
+
+
+def run_cip_pipeline(question: str, answer: str | None = None, paraphraser: str | None = None) -> dict:
+    """
+    Run the full CIP pipeline.
+
+    If answer is None → asks the LLM first.
+    If answer is provided → analyses that answer (e.g. one already
+    streamed to the user via llm_interface.real_llm.stream_answer).
+    paraphraser → "llm" or "rules" for Module 3 (default CIP_PARAPHRASER).
+    """
 
     print("\n" + "=" * 70)
     print("              CIP HALLUCINATION DETECTION PIPELINE")
@@ -125,7 +208,8 @@ def run_cip_pipeline(question: str) -> dict:
     print("=" * 70)
 
     # Step 1: LLM answer
-    answer = llm_answer(question)
+    if answer is None:
+        answer = llm_answer(question)
 
     print("\n┌─────────────────────────────────────────────────────────────────┐")
     print("│  MODULE 2 · TEXT PREPROCESSING                                │")
@@ -133,12 +217,17 @@ def run_cip_pipeline(question: str) -> dict:
     print(f"│  Question (clean) : {question[:55]}")
     print(f"│  LLM Answer       : {answer[:55]}{'…' if len(answer) > 55 else ''}")
 
+    # Steps 3 + 4 only need the answer — start their LLM calls now and
+    # let them run in the background while the embedding is computed.
+    probes = submit(_run_probes(question, answer, paraphraser))
+
     # Step 2: Embedding
     m2 = module2_process(question, answer)
 
     embedding = extractor.extract(
         m2["input_ids"],
-        m2["attention_mask"]
+        m2["attention_mask"],
+        qa_text=m2["qa_text"]
     ).cpu().numpy().flatten()
 
     print(f"│  QA Text           : {m2['qa_text'][:55]}{'…' if len(m2['qa_text']) > 55 else ''}")
@@ -154,9 +243,9 @@ def run_cip_pipeline(question: str) -> dict:
     print(f"│  Embedding norm    : {float(np.linalg.norm(embedding)):.4f}")
     print("└─────────────────────────────────────────────────────────────────┘")
 
-    # Step 3: Consistency
-    m3_out = m3.run(question, answer)
+    m3_out, m4_out = probes.result()
 
+    # Step 3: Consistency
     consistency = m3_out.get("consistency_score") or 0.0
     paraphrases = m3_out.get("paraphrases", [])
     rephrased_answers = m3_out.get("rephrased_answers", [])
@@ -165,7 +254,7 @@ def run_cip_pipeline(question: str) -> dict:
     print("│  MODULE 3 · REPHRASE CONSISTENCY ANALYZER                     │")
     print("├─────────────────────────────────────────────────────────────────┤")
     print(f"│  Consistency Score : {consistency:.4f}")
-    print(f"│  Paraphrases ({len(paraphrases)})  :")
+    print(f"│  Paraphrases ({len(paraphrases)})  : via {m3_out.get('paraphraser', 'llm')}")
     for i, p in enumerate(paraphrases, 1):
         print(f"│    {i}. {p[:58]}{'…' if len(p) > 58 else ''}")
     print(f"│  Rephrased Answers ({len(rephrased_answers)}):")
@@ -176,8 +265,6 @@ def run_cip_pipeline(question: str) -> dict:
     print("└─────────────────────────────────────────────────────────────────┘")
 
     # Step 4: Negation
-    m4_out = m4.run(question, answer)
-
     negation = m4_out.get("contradiction_score", 0.0)
     negated_question = m4_out.get("negated_question")
     negated_answer = m4_out.get("negated_answer")
@@ -275,10 +362,11 @@ def run_cip_pipeline(question: str) -> dict:
         try:
             lime_explanation = explainer.explain_instance(vector.flatten())
         except Exception as e:
-            logger.warning(f"LIME explanation failed: {e}")
+            logger.warning(f"{EXPLAINER} explanation failed: {e}")
 
     print("\n┌─────────────────────────────────────────────────────────────────┐")
-    print("│  MODULE 9 · EXPLAINABILITY (LIME)                             │")
+    title = f"MODULE 9 · EXPLAINABILITY ({'Shapley' if EXPLAINER == 'shapley' else 'LIME'})"
+    print(f"│  {title:<61}│")
     print("├─────────────────────────────────────────────────────────────────┤")
     if lime_explanation:
         print(f"│  Embedding Signal    : {lime_explanation['embedding_signal']:+.4f}")
@@ -286,7 +374,7 @@ def run_cip_pipeline(question: str) -> dict:
         print(f"│  Negation Signal     : {lime_explanation['negation_signal']:+.4f}")
         print(f"│  Dominant Signal     : ⭐ {lime_explanation['dominant_signal']}")
     else:
-        print("│  ⚠️  LIME unavailable (model or background data not found)")
+        print("│  ⚠️  Explainer unavailable (model or background data not found)")
     print("└─────────────────────────────────────────────────────────────────┘")
 
     # Step 10: Natural Language Explanation
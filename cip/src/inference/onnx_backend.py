@@ -0,0 +1,371 @@
+# cip/src/inference/onnx_backend.py
+
+"""
+ONNX Runtime backend for the transformer encoders.
+
+  • DistilBERT (Module 5)         → last_hidden_state
+  • roberta-large-mnli (Module 4) → logits
+  • nli-distilroberta-base         → logits (small model of the NLI cascade)
+  • all-MiniLM-L6-v2 (Module 3)   → mean-pooled sentence embedding
+
+The wrappers mimic the call signatures the rest of the code already
+uses (HF `model(**inputs).logits / .last_hidden_state`, and
+SentenceTransformer `.encode()`), so callers only switch
+`backend="onnx"`.
+
+Export + parity check:
+    python -m inference.onnx_backend export --all
+    python -m inference.onnx_backend parity --all
+
+onnxruntime is optional: only needed when backend="onnx" is used.
+"""
+
+import argparse
+import json
+import os
+import types
+
+import numpy as np
+import torch
+
+_CIP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_ONNX_DIR = os.path.join(_CIP_ROOT, ".cache", "onnx")
+OPSET = 17
+
+DISTILBERT = "distilbert-base-uncased"
+NLI = "roberta-large-mnli"
+NLI_SMALL = "cross-encoder/nli-distilroberta-base"
+MINILM = "all-MiniLM-L6-v2"
+
+_PARITY_SAMPLES = [
+    ("Who invented the telephone?", "Alexander Graham Bell invented the telephone."),
+    ("What happens if you crack your knuckles a lot?", "Nothing in particular happens."),
+    ("Is the Great Wall of China visible from space?", "No, it is not visible to the naked eye from orbit."),
+    ("Who is the king of Mars?", "Elon Musk is the king of Mars."),
+]
+
+
+def _require_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "backend='onnx' needs onnxruntime: pip install onnxruntime"
+        ) from e
+    return onnxruntime
+
+
+def export_path(model_name: str, onnx_dir: str = DEFAULT_ONNX_DIR, revision: str = "main") -> str:
+    """Directory holding model.onnx (+ tokenizer/config) for `model_name` at `revision`."""
+    return os.path.join(onnx_dir, f"{model_name.replace('/', '__')}@{revision.replace('/', '__')}")
+
+
+# -------------------------------------------------
+# Export
+# -------------------------------------------------
+class _ExportWrapper(torch.nn.Module):
+    """Plain-tensor forward for torch.onnx.export."""
+
+    def __init__(self, model, output: str):
+        super().__init__()
+        self.model = model
+        self.output = output
+
+    def forward(self, input_ids, attention_mask):
+        out = self.model(input_ids=input_ids, attention_mask=attention_mask)
+        return getattr(out, self.output)
+
+
+def _export(model, tokenizer, output: str, out_dir: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "model.onnx")
+
+    dummy = tokenizer(*_PARITY_SAMPLES[0], return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+
+    torch.onnx.export(
+        _ExportWrapper(model.eval(), output),
+        (dummy["input_ids"], dummy["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=[output],
+        dynamic_axes={
+            "input_ids": axes,
+            "attention_mask": axes,
+            output: {0: "batch"} if output == "logits" else axes,
+        },
+        opset_version=OPSET,
+        do_constant_folding=True,
+    )
+
+    tokenizer.save_pretrained(out_dir)
+    return path
+
+
+def optimize(path: str) -> str:
+    """
+    Run ORT graph optimizations offline (constant folding, node fusion)
+    and save the result next to the input as model.opt.onnx.
+    """
+    ort = _require_onnxruntime()
+
+    optimized = path.replace(".onnx", ".opt.onnx")
+    options = ort.SessionOptions()
+    # EXTENDED (not ALL) keeps the saved graph portable across CPUs
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = optimized
+    ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    return optimized
+
+
+def export_distilbert(
+    model_name: str = DISTILBERT,
+    onnx_dir: str = DEFAULT_ONNX_DIR,
+    revision: str = "main"
+) -> str:
+    from transformers import AutoTokenizer, DistilBertModel
+
+    out_dir = export_path(model_name, onnx_dir, revision)
+    model = DistilBertModel.from_pretrained(model_name, revision=revision)
+    model.config.save_pretrained(out_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+    return optimize(_export(model, tokenizer, "last_hidden_state", out_dir))
+
+
+def export_nli(model_name: str = NLI, onnx_dir: str = DEFAULT_ONNX_DIR, revision: str = "main") -> str:
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    out_dir = export_path(model_name, onnx_dir, revision)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision)
+    # config carries id2label, needed for the label order
+    model.config.save_pretrained(out_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+    return optimize(_export(model, tokenizer, "logits", out_dir))
+
+
+def export_nli_small(
+    model_name: str = NLI_SMALL,
+    onnx_dir: str = DEFAULT_ONNX_DIR,
+    revision: str = "main"
+) -> str:
+    """Small cascade model (NLIScorer(cascade=True, backend="onnx"))."""
+    return export_nli(model_name, onnx_dir, revision)
+
+
+def export_sentence_transformer(model_name: str = MINILM, onnx_dir: str = DEFAULT_ONNX_DIR) -> str:
+    from sentence_transformers import SentenceTransformer, models as st_models
+
+    out_dir = export_path(model_name, onnx_dir)
+    st = SentenceTransformer(model_name, device="cpu")
+
+    transformer = st[0]
+    pooling = next(m for m in st if isinstance(m, st_models.Pooling))
+    if pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"Only mean pooling is supported, got {pooling.get_pooling_mode_str()}")
+
+    path = _export(transformer.auto_model, transformer.tokenizer, "last_hidden_state", out_dir)
+
+    with open(os.path.join(out_dir, "sentence_transformer.json"), "w") as f:
+        json.dump({
+            "normalize": any(isinstance(m, st_models.Normalize) for m in st),
+            "max_seq_length": st.max_seq_length,
+        }, f)
+
+    return optimize(path)
+
+
+# -------------------------------------------------
+# Runtime wrappers
+# -------------------------------------------------
+def _session(out_dir: str):
+    ort = _require_onnxruntime()
+
+    path = os.path.join(out_dir, "model.opt.onnx")
+    if not os.path.isfile(path):
+        path = os.path.join(out_dir, "model.onnx")
+    if not os.path.isfile(path):
+        raise FileNotFoundError(
+            f"No ONNX export in {out_dir}; run: python -m inference.onnx_backend export --all"
+        )
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+class OnnxModel:
+    """
+    Drop-in for a HF model's forward: `model(**inputs)` returns an object
+    with `.logits` or `.last_hidden_state` as a torch tensor.
+    """
+
+    def __init__(self, model_name: str, onnx_dir: str = DEFAULT_ONNX_DIR, revision: str = "main"):
+        from transformers import AutoConfig
+
+        self.out_dir = export_path(model_name, onnx_dir, revision)
+        self.session = _session(self.out_dir)
+        self.config = AutoConfig.from_pretrained(self.out_dir)
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self._output = self.session.get_outputs()[0].name
+
+    def __call__(self, **inputs):
+        feed = {
+            k: (v.cpu().numpy() if isinstance(v, torch.Tensor) else np.asarray(v)).astype(np.int64)
+            for k, v in inputs.items()
+            if k in self._inputs
+        }
+        (out,) = self.session.run([self._output], feed)
+        return types.SimpleNamespace(**{self._output: torch.from_numpy(out)})
+
+    # HF-model API used by callers
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+
+def load_tokenizer(model_name: str, onnx_dir: str = DEFAULT_ONNX_DIR, revision: str = "main"):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(export_path(model_name, onnx_dir, revision))
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer.encode() replacement: tokenize → ONNX encoder →
+    mean pooling → (optional) L2 normalization.
+    """
+
+    def __init__(self, model_name: str = MINILM, onnx_dir: str = DEFAULT_ONNX_DIR):
+        out_dir = export_path(model_name, onnx_dir)
+        with open(os.path.join(out_dir, "sentence_transformer.json")) as f:
+            meta = json.load(f)
+
+        self.normalize = meta["normalize"]
+        self.max_seq_length = meta["max_seq_length"]
+        self.tokenizer = load_tokenizer(model_name, onnx_dir)
+        self.model = OnnxModel(model_name, onnx_dir)
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **_
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        chunks = []
+        for start in range(0, len(sentences), batch_size):
+            batch = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            hidden = self.model(**batch).last_hidden_state.numpy()
+            mask = batch["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if self.normalize or normalize_embeddings:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+            chunks.append(pooled.astype(np.float32))
+
+        out = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+        return out[0] if single else out
+
+
+# -------------------------------------------------
+# Numerical parity (torch vs ONNX)
+# -------------------------------------------------
+def check_parity(component: str, onnx_dir: str = DEFAULT_ONNX_DIR, atol: float = 1e-3) -> float:
+    """
+    Max absolute difference between torch and ONNX outputs on a few QA
+    pairs for component in {"distilbert", "nli", "nli-small", "minilm"}.
+    Raises RuntimeError if it exceeds `atol`.
+    """
+    if component == "distilbert":
+        from transformers import AutoTokenizer, DistilBertModel
+
+        tok = AutoTokenizer.from_pretrained(DISTILBERT)
+        ref = DistilBertModel.from_pretrained(DISTILBERT).eval()
+        onnx = OnnxModel(DISTILBERT, onnx_dir)
+        texts = [f"{q} [SEP] {a}" for q, a in _PARITY_SAMPLES]
+        inputs = tok(texts, padding=True, return_tensors="pt")
+        with torch.no_grad():
+            expected = ref(**inputs).last_hidden_state[:, 0, :].numpy()
+        actual = onnx(**inputs).last_hidden_state[:, 0, :].numpy()
+
+    elif component in ("nli", "nli-small"):
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        name = NLI if component == "nli" else NLI_SMALL
+        tok = AutoTokenizer.from_pretrained(name)
+        ref = AutoModelForSequenceClassification.from_pretrained(name).eval()
+        onnx = OnnxModel(name, onnx_dir)
+        inputs = tok(
+            [q for q, _ in _PARITY_SAMPLES], [a for _, a in _PARITY_SAMPLES],
+            padding=True, return_tensors="pt"
+        )
+        with torch.no_grad():
+            expected = torch.softmax(ref(**inputs).logits, dim=-1).numpy()
+        actual = torch.softmax(onnx(**inputs).logits, dim=-1).numpy()
+
+    elif component == "minilm":
+        from sentence_transformers import SentenceTransformer
+
+        texts = [a for _, a in _PARITY_SAMPLES]
+        expected = SentenceTransformer(MINILM, device="cpu").encode(texts)
+        actual = OnnxSentenceEncoder(MINILM, onnx_dir).encode(texts)
+
+    else:
+        raise ValueError(f"Unknown component: {component!r}")
+
+    diff = float(np.abs(expected - actual).max())
+    if diff > atol:
+        raise RuntimeError(f"{component}: ONNX differs from torch by {diff:.2e} (atol {atol:.0e})")
+    return diff
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+_EXPORTERS = {
+    "distilbert": export_distilbert,
+    "nli": export_nli,
+    "nli-small": export_nli_small,
+    "minilm": export_sentence_transformer,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX export / parity for CIP encoders")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("components", nargs="*", help=f"any of {', '.join(_EXPORTERS)}")
+    parser.add_argument("--all", action="store_true", help="every component")
+    parser.add_argument("--onnx-dir", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--atol", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    components = list(_EXPORTERS) if args.all or not args.components else args.components
+    unknown = set(components) - set(_EXPORTERS)
+    if unknown:
+        parser.error(f"unknown component(s): {', '.join(sorted(unknown))}")
+
+    for name in components:
+        if args.command == "export":
+            path = _EXPORTERS[name](onnx_dir=args.onnx_dir)
+            print(f"{name:<11} → {path}")
+        else:
+            diff = check_parity(name, args.onnx_dir, args.atol)
+            print(f"{name:<11} max |torch - onnx| = {diff:.2e}  ✅")
+
+
+if __name__ == "__main__":
+    main()
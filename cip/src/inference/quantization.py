@@ -0,0 +1,166 @@
+# cip/src/inference/quantization.py
+
+"""
+Int8 dynamic quantization with an accuracy gate.
+
+  • torch dynamic quantization of every nn.Linear (weights int8,
+    activations quantized on the fly) — CPU only
+  • quantized weights cached on disk, so start-up skips re-quantizing
+  • before the first use, the int8 model is compared against fp32 on
+    a TruthfulQA sample; if drift exceeds `max_drift` the fp32 model
+    is used instead and the refusal is recorded
+
+Artifacts live in cip/.cache/quantized/<model>@<revision>/:
+    model.pt     int8 state_dict (only written if the gate passed)
+    drift.json   gate result (drift, threshold, sample size, versions)
+"""
+
+import json
+import logging
+import os
+import random
+import time
+
+import torch
+
+_CIP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_QUANT_DIR = os.path.join(_CIP_ROOT, ".cache", "quantized")
+TRUTHFULQA_PATH = os.path.join(_CIP_ROOT, "data", "truthfulQA", "TruthfulQA.csv")
+
+# Questions drawn from TruthfulQA for the drift check
+SAMPLE_SIZE = 64
+
+logger = logging.getLogger("Quantization")
+
+
+def quantize(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic int8 quantization of all linear layers (returns a copy)."""
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def quant_path(model_name: str, quant_dir: str = DEFAULT_QUANT_DIR, revision: str = "main") -> str:
+    return os.path.join(quant_dir, f"{model_name.replace('/', '__')}@{revision.replace('/', '__')}")
+
+
+def truthfulqa_sample(n: int = SAMPLE_SIZE, seed: int = 0) -> list[tuple[str, str]]:
+    """
+    (question, answer) pairs from TruthfulQA: for each sampled question
+    its best answer and first incorrect answer, so the sample covers
+    both entailing and contradicting pairs.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(TRUTHFULQA_PATH, encoding="utf-8-sig")
+    df = df.dropna(subset=["Question", "Best Answer"])
+
+    rows = random.Random(seed).sample(range(len(df)), min(n, len(df)))
+
+    pairs = []
+    for i in rows:
+        row = df.iloc[i]
+        pairs.append((row["Question"], row["Best Answer"]))
+
+        incorrect = str(row.get("Incorrect Answers", "") or "").split(";")[0].strip()
+        if incorrect and incorrect.lower() != "nan":
+            pairs.append((row["Question"], incorrect))
+
+    return pairs
+
+
+def quantization_report(
+    model_name: str,
+    quant_dir: str = DEFAULT_QUANT_DIR,
+    revision: str = "main"
+) -> dict | None:
+    """Last drift-gate result for `model_name`, or None if never validated."""
+    path = os.path.join(quant_path(model_name, quant_dir, revision), "drift.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_quantized(
+    model_name: str,
+    load_fp32,
+    build_empty,
+    measure_drift,
+    max_drift: float,
+    metric: str,
+    quant_dir: str = DEFAULT_QUANT_DIR,
+    revision: str = "main"
+) -> tuple[torch.nn.Module, bool]:
+    """
+    Return (model, quantized).
+
+    load_fp32()                  → pretrained fp32 model at `revision`
+    build_empty()                → same architecture, uninitialized weights
+                                   (skeleton for the cached int8 state_dict)
+    measure_drift(fp32, int8)    → float, compared against max_drift
+
+    The gate result is cached per (model, revision); it is re-run when
+    the threshold, sample size or torch version changes.
+
+    Both returned models are on CPU. Callers move an fp32 fallback
+    (quantized=False) to their usual device, and include max_drift in
+    any in-process cache key, since the threshold decides which model
+    comes back.
+    """
+    out_dir = quant_path(model_name, quant_dir, revision)
+    weights = os.path.join(out_dir, "model.pt")
+    settings = {
+        "revision": revision,
+        "metric": metric,
+        "max_drift": max_drift,
+        "sample_size": SAMPLE_SIZE,
+        "torch": torch.__version__,
+    }
+
+    report = quantization_report(model_name, quant_dir, revision)
+    if report is not None and all(report.get(k) == v for k, v in settings.items()):
+        if not report["passed"]:
+            logger.warning(
+                f"{model_name}: int8 refused earlier ({metric} drift "
+                f"{report['drift']:.4f} > {max_drift}) — using fp32"
+            )
+            return load_fp32(), False
+
+        if os.path.isfile(weights):
+            model = quantize(build_empty())
+            model.load_state_dict(torch.load(weights, map_location="cpu"))
+            model.eval()
+            return model, True
+
+    # First run (or settings changed): quantize and validate
+    fp32 = load_fp32()
+    start = time.perf_counter()
+    int8 = quantize(fp32)
+    int8.eval()
+    drift = float(measure_drift(fp32, int8))
+    passed = drift <= max_drift
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "drift.json"), "w") as f:
+        json.dump({
+            **settings,
+            "model": model_name,
+            "drift": drift,
+            "passed": passed,
+            "seconds": round(time.perf_counter() - start, 2),
+        }, f, indent=2)
+
+    if not passed:
+        logger.warning(
+            f"{model_name}: int8 {metric} drift {drift:.4f} exceeds {max_drift} "
+            f"— quantization not enabled, using fp32"
+        )
+        if os.path.isfile(weights):
+            os.remove(weights)
+        return fp32, False
+
+    torch.save(int8.state_dict(), weights)
+    logger.info(f"{model_name}: int8 enabled ({metric} drift {drift:.4f} ≤ {max_drift})")
+    return int8, True
@@ -0,0 +1,328 @@
+"""
+Pluggable LLM backends.
+
+  • GroqBackend       — live Groq API (default)
+  • RecordingBackend  — wraps another backend and appends every
+                        completion to a gzip JSON-lines "tape"
+  • ReplayBackend     — serves completions from a tape with no network,
+                        with injectable latency, jitter and failures
+
+Select with set_backend(), or via environment:
+
+  CIP_LLM_BACKEND=groq | record | replay
+  CIP_LLM_TAPE                  → tape file (default cip/.cache/llm_tape.jsonl.gz)
+  CIP_LLM_REPLAY_LATENCY        → "recorded" or fixed seconds per call
+  CIP_LLM_REPLAY_JITTER         → ± seconds added uniformly at random
+  CIP_LLM_REPLAY_FAILURE_RATE   → probability [0, 1] a call raises
+  CIP_LLM_REPLAY_SEED           → RNG seed for reproducible runs
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import threading
+import time
+import weakref
+
+from llm_interface.response_cache import ResponseCache
+
+_CIP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_TAPE_PATH = os.path.join(_CIP_ROOT, ".cache", "llm_tape.jsonl.gz")
+
+
+class InjectedLLMError(RuntimeError):
+    """Synthetic failure raised by ReplayBackend(failure_rate > 0)."""
+
+    # Behaves like a transient server error for retry / breaker logic
+    status_code = 503
+
+
+class ReplayMissError(KeyError):
+    """The requested completion is not on the replay tape."""
+
+
+class LLMBackend:
+    """
+    Base interface: one chat completion → stripped answer text.
+    stream() yields text deltas; the default emits the whole completion.
+
+    cacheable=False tells the caller to skip the response cache, so that
+    recordings see every request and replays pay their injected latency.
+    rate_limited=False skips only the provider's rpm/tpm token buckets
+    (no quota to respect, e.g. a replay tape); calls still take a
+    concurrency slot and go through the retry / circuit-breaker logic.
+    """
+
+    name = "base"
+    cacheable = True
+    rate_limited = True
+
+    async def complete(
+        self,
+        model: str,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        model: str,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ):
+        yield await self.complete(model, system, prompt, temperature, max_tokens)
+
+
+# -------------------------------------------------
+# Live Groq
+# -------------------------------------------------
+class GroqBackend(LLMBackend):
+
+    name = "groq"
+
+    def __init__(self):
+        # One AsyncGroq client (and connection pool) per event loop
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            from groq import AsyncGroq
+            client = self._clients[loop] = AsyncGroq(api_key=os.environ["GROQ_API_KEY"])
+        return client
+
+    @staticmethod
+    def _messages(system: str, prompt: str) -> list[dict]:
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def complete(self, model, system, prompt, temperature, max_tokens) -> str:
+        response = await self._client().chat.completions.create(
+            model=model,
+            messages=self._messages(system, prompt),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content.strip()
+
+    async def stream(self, model, system, prompt, temperature, max_tokens):
+        stream = await self._client().chat.completions.create(
+            model=model,
+            messages=self._messages(system, prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            # Closing early stops generation on the server side too
+            await stream.close()
+
+
+# -------------------------------------------------
+# Record
+# -------------------------------------------------
+class RecordingBackend(LLMBackend):
+    """
+    Pass-through to `inner`, appending one record per completion:
+      {"key": <request hash>, "model": ..., "response": ..., "latency": <s>}
+    """
+
+    name = "record"
+    cacheable = False
+
+    def __init__(self, inner: LLMBackend, path: str = DEFAULT_TAPE_PATH):
+        self.inner = inner
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    async def complete(self, model, system, prompt, temperature, max_tokens) -> str:
+        start = time.perf_counter()
+        answer = await self.inner.complete(model, system, prompt, temperature, max_tokens)
+        self._record(model, system, prompt, temperature, max_tokens, answer, time.perf_counter() - start)
+        return answer
+
+    async def stream(self, model, system, prompt, temperature, max_tokens):
+        start = time.perf_counter()
+        parts = []
+        async for delta in self.inner.stream(model, system, prompt, temperature, max_tokens):
+            parts.append(delta)
+            yield delta
+        # Only streams that ran to completion are recorded
+        answer = "".join(parts).strip()
+        self._record(model, system, prompt, temperature, max_tokens, answer, time.perf_counter() - start)
+
+    def _record(self, model, system, prompt, temperature, max_tokens, answer, latency) -> None:
+        record = {
+            "key": ResponseCache.make_key(model, system, prompt, temperature, max_tokens),
+            "model": model,
+            "response": answer,
+            "latency": round(latency, 4),
+        }
+
+        # gzip "a" appends a new member; readers see one continuous stream
+        with self._lock, gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.recorded += 1
+
+
+# -------------------------------------------------
+# Replay
+# -------------------------------------------------
+class ReplayBackend(LLMBackend):
+    """
+    Offline backend serving recorded completions.
+
+    latency:       "recorded" → sleep for the recorded latency,
+                   float      → sleep a fixed number of seconds
+    jitter:        uniform ± seconds added to each sleep
+    failure_rate:  probability of raising InjectedLLMError
+    seed:          makes latency/failure draws reproducible
+    """
+
+    name = "replay"
+    cacheable = False
+    rate_limited = False
+
+    def __init__(
+        self,
+        path: str = DEFAULT_TAPE_PATH,
+        latency: float | str = "recorded",
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int | None = None
+    ):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+        self.calls = 0
+        self.misses = 0
+        self.failures = 0
+
+        self._tape: dict[str, tuple[str, float]] = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                # Last recording of a key wins
+                self._tape[rec["key"]] = (rec["response"], float(rec.get("latency", 0.0)))
+
+    def __len__(self) -> int:
+        return len(self._tape)
+
+    def _delay(self, recorded: float) -> float:
+        base = recorded if self.latency == "recorded" else float(self.latency)
+        if self.jitter:
+            base += self._rng.uniform(-self.jitter, self.jitter)
+        return max(base, 0.0)
+
+    async def _replay(self, model, system, prompt, temperature, max_tokens) -> str:
+        self.calls += 1
+        key = ResponseCache.make_key(model, system, prompt, temperature, max_tokens)
+
+        entry = self._tape.get(key)
+        if entry is None:
+            self.misses += 1
+            raise ReplayMissError(f"No recorded completion for {model} prompt: {prompt[:60]!r}")
+
+        response, recorded_latency = entry
+
+        # Draw both values up front so the RNG sequence is order-independent
+        delay = self._delay(recorded_latency)
+        fail = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+        await asyncio.sleep(delay)
+
+        if fail:
+            self.failures += 1
+            raise InjectedLLMError("Injected LLM failure (replay)")
+
+        return response
+
+    async def complete(self, model, system, prompt, temperature, max_tokens) -> str:
+        return await self._replay(model, system, prompt, temperature, max_tokens)
+
+    async def stream(self, model, system, prompt, temperature, max_tokens):
+        response = await self._replay(model, system, prompt, temperature, max_tokens)
+        # Word-sized deltas, roughly like a real token stream
+        for delta in re.findall(r"\S+\s*", response):
+            yield delta
+            await asyncio.sleep(0)
+
+    def stats(self) -> dict:
+        return {
+            "tape_entries": len(self._tape),
+            "calls": self.calls,
+            "misses": self.misses,
+            "failures": self.failures,
+        }
+
+
+# -------------------------------------------------
+# Active backend
+# -------------------------------------------------
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _backend_from_env() -> LLMBackend:
+    kind = os.environ.get("CIP_LLM_BACKEND", "groq").lower()
+    tape = os.environ.get("CIP_LLM_TAPE", DEFAULT_TAPE_PATH)
+
+    if kind == "groq":
+        return GroqBackend()
+
+    if kind == "record":
+        return RecordingBackend(GroqBackend(), path=tape)
+
+    if kind == "replay":
+        latency = os.environ.get("CIP_LLM_REPLAY_LATENCY", "recorded")
+        seed = os.environ.get("CIP_LLM_REPLAY_SEED")
+        return ReplayBackend(
+            path=tape,
+            latency=latency if latency == "recorded" else float(latency),
+            jitter=float(os.environ.get("CIP_LLM_REPLAY_JITTER", "0")),
+            failure_rate=float(os.environ.get("CIP_LLM_REPLAY_FAILURE_RATE", "0")),
+            seed=int(seed) if seed is not None else None
+        )
+
+    raise ValueError(f"Unknown CIP_LLM_BACKEND: {kind!r} (expected groq, record or replay)")
+
+
+def get_backend() -> LLMBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _backend_from_env()
+    return _backend
+
+
+def set_backend(backend: LLMBackend) -> None:
+    """Swap the backend used by llm_interface.real_llm (e.g. in benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
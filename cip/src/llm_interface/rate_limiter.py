@@ -0,0 +1,379 @@
+"""
+Client-side rate limiting for LLM calls.
+
+  • TokenBucket     — requests/min and tokens/min budgets per model
+  • AIMDLimiter     — adaptive concurrency: additive increase on healthy
+                      responses, multiplicative decrease on 429s and on
+                      latency growth
+  • CircuitBreaker  — after repeated upstream failures, fail fast for a
+                      cool-down period instead of queueing more work
+
+RateLimiter ties the three together per model, and call() adds
+retry-with-backoff for 429 / 5xx responses (honouring Retry-After).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+from llm_interface.stats import LatencyStats
+
+
+class ModelLimits(NamedTuple):
+    rpm: int    # requests per minute
+    tpm: int    # tokens per minute (prompt + completion)
+
+
+# Groq on-demand tier defaults; override with set_model_limits()
+MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": ModelLimits(rpm=30, tpm=12_000),
+    "llama-3.1-70b-versatile": ModelLimits(rpm=30, tpm=6_000),
+}
+DEFAULT_LIMITS = ModelLimits(rpm=30, tpm=6_000)
+
+MAX_RETRIES = int(os.environ.get("CIP_LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = 1.0      # seconds; doubled per attempt, with full jitter
+BACKOFF_CAP = 30.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while a model's breaker is open."""
+
+
+# -------------------------------------------------
+# Error classification
+# -------------------------------------------------
+def _status(error: BaseException) -> int | None:
+    return getattr(error, "status_code", None)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return _status(error) == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx, timeouts and dropped connections."""
+    status = _status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after(error: BaseException) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(system: str, prompt: str, max_tokens: int) -> int:
+    """~4 characters per token, plus the worst-case completion."""
+    return (len(system) + len(prompt)) // 4 + max_tokens
+
+
+# -------------------------------------------------
+# Token bucket
+# -------------------------------------------------
+class TokenBucket:
+    """
+    Reservation-based token bucket.
+
+    Callers reserve immediately and sleep for their share of the deficit,
+    so waiters are served in arrival order without an asyncio lock
+    (usable from any event loop).
+    """
+
+    def __init__(self, per_minute: float, burst: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, n: float = 1) -> float:
+        """Take n tokens; returns how long the caller must wait."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= n
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, n: float) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + n)
+
+    async def acquire(self, n: float = 1) -> None:
+        wait = self.reserve(n)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# -------------------------------------------------
+# Adaptive concurrency (AIMD)
+# -------------------------------------------------
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by ~1 per window of successes and halves
+    on overload. Latency above `latency_tolerance` × the p10 baseline is
+    treated as mild overload (×0.9).
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        latency_tolerance: float = 2.0
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.latency = LatencyStats(window=200)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, seconds: float) -> None:
+        baseline = self.latency.percentile(10) if len(self.latency) >= 20 else None
+        self.latency.record(seconds)
+
+        if baseline and seconds > self.latency_tolerance * baseline:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_overload(self) -> None:
+        self.limit = max(self.min_limit, self.limit * 0.5)
+
+
+# -------------------------------------------------
+# Circuit breaker
+# -------------------------------------------------
+class CircuitBreaker:
+    """
+    closed     → calls pass; `failure_threshold` consecutive failures open it
+    open       → calls fail fast with CircuitOpenError for `cooldown` seconds
+    half-open  → one probe call; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def check(self, name: str) -> None:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit open for {name}; shedding request")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release_probe(self) -> None:
+        """Outcome says nothing about upstream health; let another probe through."""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+# -------------------------------------------------
+# Combined limiter
+# -------------------------------------------------
+class _ModelGate:
+    def __init__(self, limits: ModelLimits):
+        self.limits = limits
+        self.requests = TokenBucket(limits.rpm)
+        self.tokens = TokenBucket(limits.tpm)
+        self.breaker = CircuitBreaker()
+        self.stats = LatencyStats()
+
+
+class RateLimiter:
+    """
+    Process-wide limiter: per-model request/token buckets and circuit
+    breakers, plus one AIMD concurrency limiter per event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 8, limits: dict | None = None):
+        self.max_concurrency = max_concurrency
+        self._limits = dict(MODEL_LIMITS if limits is None else limits)
+        self._gates: dict[str, _ModelGate] = {}
+        self._concurrency = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def set_model_limits(self, model: str, limits: ModelLimits) -> None:
+        with self._lock:
+            self._limits[model] = limits
+            self._gates.pop(model, None)
+
+    def _gate(self, model: str) -> _ModelGate:
+        with self._lock:
+            gate = self._gates.get(model)
+            if gate is None:
+                gate = self._gates[model] = _ModelGate(self._limits.get(model, DEFAULT_LIMITS))
+            return gate
+
+    def concurrency(self) -> AIMDLimiter:
+        loop = asyncio.get_running_loop()
+        limiter = self._concurrency.get(loop)
+        if limiter is None:
+            limiter = self._concurrency[loop] = AIMDLimiter(
+                initial=self.max_concurrency,
+                max_limit=self.max_concurrency
+            )
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, model: str, estimated_tokens: int, budgets: bool = True):
+        """
+        One upstream attempt: breaker check → budgets → concurrency slot.
+        Outcome feeds the breaker and the AIMD controller.
+
+        budgets=False skips only the rpm/tpm token buckets (backends with
+        no provider quota); the breaker and concurrency slot still apply.
+        """
+        gate = self._gate(model)
+        gate.breaker.check(model)
+
+        concurrency = self.concurrency()
+        try:
+            if budgets:
+                await gate.requests.acquire(1)
+                await gate.tokens.acquire(min(estimated_tokens, gate.tokens.capacity))
+            await concurrency.acquire()
+        except BaseException:
+            # Cancelled while queued: never reached upstream, so a
+            # half-open probe must not stay claimed
+            gate.breaker.release_probe()
+            raise
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limited(e):
+                gate.stats.incr("rate_limited")
+                concurrency.on_overload()
+            if is_retryable(e):
+                gate.stats.incr("upstream_errors")
+                gate.breaker.record_failure()
+            else:
+                gate.breaker.release_probe()
+            raise
+        except BaseException:
+            # Cancelled (e.g. a hedged loser) — says nothing about upstream health
+            gate.breaker.release_probe()
+            raise
+        else:
+            elapsed = time.perf_counter() - start
+            gate.stats.record(elapsed)
+            gate.breaker.record_success()
+            concurrency.on_success(elapsed)
+        finally:
+            await concurrency.release()
+
+    async def call(self, model: str, estimated_tokens: int, make_call, budgets: bool = True):
+        """
+        Run `make_call()` (a coroutine factory) under the limiter, retrying
+        429 / 5xx with exponential backoff or the server's Retry-After.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with self.slot(model, estimated_tokens, budgets):
+                    return await make_call()
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if not is_retryable(e) or attempt == MAX_RETRIES:
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                self._gate(model).stats.incr("retries")
+                await asyncio.sleep(delay)
+
+    def refund_tokens(self, model: str, n: int) -> None:
+        """Return over-estimated completion tokens to the model's budget."""
+        if n > 0:
+            self._gate(model).tokens.refund(n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            gates = dict(self._gates)
+
+        report = {
+            model: {
+                **gate.stats.summary(),
+                "breaker": gate.breaker.state,
+                "shed": gate.breaker.rejected,
+            }
+            for model, gate in gates.items()
+        }
+        report["concurrency_limits"] = [
+            round(limiter.limit, 2) for limiter in list(self._concurrency.values())
+        ]
+        return report
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter(max_concurrency: int = 8) -> RateLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(max_concurrency=max_concurrency)
+    return _limiter
@@ -1,10 +1,33 @@
-from groq import Groq
+import asyncio
 import os
+import queue
+import threading
+import time
 
-client = Groq(api_key=os.environ["GROQ_API_KEY"])
+from llm_interface.backends import get_backend
+from llm_interface.rate_limiter import estimate_tokens, get_rate_limiter
+from llm_interface.response_cache import ResponseCache, get_cache
+from llm_interface.single_flight import get_single_flight
+from llm_interface.stats import LatencyStats
 
 BAD_PATTERNS = ["i don't know", "i do not know", "as an ai", "i cannot"]
 
+# -------------------------------------------------
+# Model configuration
+# -------------------------------------------------
+PRIMARY_MODEL = "llama-3.3-70b-versatile"
+PRIMARY_SYSTEM = "Answer factually and concisely."
+
+FALLBACK_MODEL = "llama-3.1-70b-versatile"
+FALLBACK_SYSTEM = "Answer factually and directly. Do not say you don't know unless absolutely necessary."
+
+MAX_TOKENS = 256
+
+# Upper bound on in-flight Groq requests per event loop; the adaptive
+# limiter in rate_limiter.py works below this ceiling
+MAX_CONCURRENCY = int(os.environ.get("CIP_LLM_MAX_CONCURRENCY", "8"))
+
+
 def is_weak_answer(text: str) -> bool:
     t = text.lower()
     if len(t) < 20:
@@ -13,34 +36,506 @@ def is_weak_answer(text: str) -> bool:
         return True
     return False
 
-def llm_answer(prompt: str) -> str:
-    # First attempt
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": "Answer factually and concisely."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2,
-        max_tokens=256
+
+# -------------------------------------------------
+# Shared event loop for the sync wrappers
+# -------------------------------------------------
+# All blocking callers funnel their coroutines into ONE background loop,
+# so they share a single HTTP connection pool and concurrency budget.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever,
+                name="llm-interface-loop",
+                daemon=True
+            ).start()
+    return _loop
+
+
+def submit(coro):
+    """
+    Schedule a coroutine on the shared LLM loop without waiting.
+    Returns a concurrent.futures.Future.
+    """
+    loop = _background_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        coro.close()
+        raise RuntimeError(
+            "Blocking LLM wrappers cannot be used on the LLM loop; await the coroutine instead."
+        )
+
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared LLM loop and block for its result."""
+    return submit(coro).result()
+
+
+async def _acomplete(
+    model: str,
+    system: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int = MAX_TOKENS,
+    use_cache: bool = True,
+    on_upstream=None
+) -> str:
+    """
+    One completion: response cache → single-flight → rate limiter → backend.
+
+    on_upstream(seconds, answer) is called only when this call actually
+    went upstream (not on cache hits or when joining an in-flight call).
+    """
+    backend = get_backend()
+    cache = get_cache() if use_cache and backend.cacheable else None
+    key = ResponseCache.make_key(model, system, prompt, temperature, max_tokens)
+
+    # SQLite I/O runs off the event loop all fanned-out calls share
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+    async def upstream() -> str:
+        start = time.perf_counter()
+
+        limiter = get_rate_limiter(MAX_CONCURRENCY)
+        estimate = estimate_tokens(system, prompt, max_tokens)
+
+        # Backends without a provider quota skip only the rpm/tpm budgets
+        answer = await limiter.call(
+            model, estimate,
+            lambda: backend.complete(model, system, prompt, temperature, max_tokens),
+            budgets=backend.rate_limited
+        )
+        if backend.rate_limited:
+            limiter.refund_tokens(model, estimate - estimate_tokens(system, prompt, len(answer) // 4))
+
+        if on_upstream is not None:
+            on_upstream(time.perf_counter() - start, answer)
+
+        if cache is not None:
+            await asyncio.to_thread(cache.put, key, model, answer)
+
+        return answer
+
+    # Identical concurrent requests share one upstream call
+    return await get_single_flight().do(key, upstream)
+
+
+# -------------------------------------------------
+# Hedging
+# -------------------------------------------------
+# off         → primary, then fallback only if the answer is weak
+# latency     → also fire the fallback once the primary has run longer
+#               than HEDGE_PERCENTILE of recent primary latencies
+# speculative → fire both at once for question classes that often get
+#               weak answers; other classes behave like "latency"
+HEDGE_MODES = ("off", "latency", "speculative")
+HEDGE_MODE = os.environ.get("CIP_LLM_HEDGE", "off")
+HEDGE_PERCENTILE = float(os.environ.get("CIP_LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_DEFAULT_DELAY = 2.0       # seconds, until enough latency samples exist
+HEDGE_MIN_SAMPLES = 20
+SPECULATIVE_WEAK_RATE = 0.3     # weak-answer rate that triggers speculation
+SPECULATIVE_MIN_SAMPLES = 5
+
+_QUESTION_CLASSES = (
+    "who", "what", "when", "where", "which", "why", "how",
+    "is", "are", "was", "were", "do", "does", "did", "can", "will",
+)
+
+_primary_latency = LatencyStats()
+_mode_stats = {mode: LatencyStats() for mode in HEDGE_MODES}
+_class_stats: dict[str, list[int]] = {}   # class → [primary answers, weak answers]
+_class_lock = threading.Lock()
+
+
+def question_class(prompt: str) -> str:
+    words = prompt.lower().split()
+    first = words[0].strip("?,.:;\"'") if words else ""
+    return first if first in _QUESTION_CLASSES else "other"
+
+
+def _record_primary(cls: str, weak: bool) -> None:
+    with _class_lock:
+        counts = _class_stats.setdefault(cls, [0, 0])
+        counts[0] += 1
+        counts[1] += int(weak)
+
+
+def _weak_rate(cls: str) -> float:
+    with _class_lock:
+        total, weak = _class_stats.get(cls, (0, 0))
+    return weak / total if total >= SPECULATIVE_MIN_SAMPLES else 0.0
+
+
+def _hedge_delay() -> float:
+    if len(_primary_latency) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return _primary_latency.percentile(HEDGE_PERCENTILE)
+
+
+async def _primary(prompt: str, use_cache: bool) -> str:
+    # Only real upstream calls feed the hedge delay and weak-answer rates;
+    # ~0 ms cache hits would drag the latency percentile toward zero
+    def record(seconds: float, answer: str) -> None:
+        _primary_latency.record(seconds)
+        _record_primary(question_class(prompt), is_weak_answer(answer))
+
+    return await _acomplete(
+        PRIMARY_MODEL, PRIMARY_SYSTEM, prompt,
+        temperature=0.2, use_cache=use_cache, on_upstream=record
     )
 
-    answer = response.choices[0].message.content.strip()
+
+async def _fallback(prompt: str, use_cache: bool) -> str:
+    return await _acomplete(
+        FALLBACK_MODEL, FALLBACK_SYSTEM, prompt,
+        temperature=0, use_cache=use_cache
+    )
+
+
+async def _answer_sequential(prompt: str, stats: LatencyStats, use_cache: bool) -> str:
+    stats.incr("upstream_calls")
+
+    # First attempt
+    answer = await _primary(prompt, use_cache)
 
     # Retry if weak
     if is_weak_answer(answer):
-        response = client.chat.completions.create(
-            model="llama-3.1-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Answer factually and directly. Do not say you don't know unless absolutely necessary."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0,
-            max_tokens=256
-        )
-        answer = response.choices[0].message.content.strip()
+        stats.incr("upstream_calls")
+        stats.incr("fallback_used")
+        answer = await _fallback(prompt, use_cache)
 
     return answer
+
+
+async def _answer_hedged(prompt: str, mode: str, stats: LatencyStats, use_cache: bool) -> str:
+    """
+    Race primary and fallback; the first acceptable answer wins and the
+    other request is cancelled. If both are weak the fallback's answer is
+    returned, matching the sequential path.
+    """
+    primary = asyncio.create_task(_primary(prompt, use_cache))
+    fallback = None
+    stats.incr("upstream_calls")
+
+    def start_fallback():
+        stats.incr("upstream_calls")
+        return asyncio.create_task(_fallback(prompt, use_cache))
+
+    if mode == "speculative" and _weak_rate(question_class(prompt)) >= SPECULATIVE_WEAK_RATE:
+        fallback = start_fallback()
+        stats.incr("hedges_speculative")
+    else:
+        done, _ = await asyncio.wait({primary}, timeout=_hedge_delay())
+        if not done:
+            fallback = start_fallback()
+            stats.incr("hedges_latency")
+
+    pending = {t for t in (primary, fallback) if t is not None}
+    primary_error = None
+    weak_fallback = None
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                error = task.exception()
+
+                if task is primary:
+                    if error is not None:
+                        primary_error = error
+                        continue
+                    answer = task.result()
+                    if not is_weak_answer(answer):
+                        stats.incr("primary_wins")
+                        return answer
+                    # Weak primary: make sure the fallback is running
+                    if fallback is None:
+                        fallback = start_fallback()
+                        pending.add(fallback)
+
+                else:
+                    if error is not None:
+                        continue
+                    answer = task.result()
+                    if not is_weak_answer(answer) or primary.done():
+                        stats.incr("fallback_wins")
+                        return answer
+                    weak_fallback = answer
+
+        if weak_fallback is not None:
+            stats.incr("fallback_wins")
+            return weak_fallback
+
+        # Both attempts failed — surface the primary's error like before
+        if primary_error is not None:
+            raise primary_error
+        raise fallback.exception()
+
+    finally:
+        for task in (primary, fallback):
+            if task is not None and not task.done():
+                task.cancel()
+                stats.incr("cancelled")
+
+
+def hedge_stats() -> dict:
+    """Per-mode end-to-end latency and upstream-call cost."""
+    report = {}
+    for mode, stats in _mode_stats.items():
+        summary = stats.summary()
+        if summary["count"]:
+            summary["calls_per_answer"] = summary.get("upstream_calls", 0) / summary["count"]
+        report[mode] = summary
+    report["primary_latency"] = _primary_latency.summary()
+    report["hedge_delay"] = _hedge_delay()
+    return report
+
+
+# -------------------------------------------------
+# Streaming
+# -------------------------------------------------
+# A streamed primary answer is buffered until STREAM_PREFIX_CHARS have
+# arrived. If that prefix already matches BAD_PATTERNS (or the whole
+# answer is shorter than the weak-answer length) the stream is aborted
+# and the fallback model is streamed instead. Past the prefix, deltas
+# are passed straight through.
+STREAM_PREFIX_CHARS = 48
+
+_stream_stats = LatencyStats()   # records time-to-first-delta
+
+
+def _is_weak_prefix(prefix: str) -> bool:
+    t = prefix.lower()
+    return any(p in t for p in BAD_PATTERNS)
+
+
+async def _astream_attempt(
+    model: str,
+    system: str,
+    prompt: str,
+    temperature: float,
+    use_cache: bool,
+    judge: bool
+):
+    """
+    Stream one model attempt. Yields text deltas; yields None (and stops)
+    if `judge` is set and the answer turns out weak before anything has
+    been emitted.
+    """
+    backend = get_backend()
+    cache = get_cache() if use_cache and backend.cacheable else None
+
+    if cache is not None:
+        key = cache.make_key(model, system, prompt, temperature, MAX_TOKENS)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            yield None if judge and is_weak_answer(cached) else cached
+            return
+
+    slot = get_rate_limiter(MAX_CONCURRENCY).slot(
+        model, estimate_tokens(system, prompt, MAX_TOKENS), budgets=backend.rate_limited
+    )
+
+    parts = []
+    emitted = not judge
+
+    # No retries here: deltas may already have been handed to the caller
+    async with slot:
+        deltas = backend.stream(model, system, prompt, temperature, MAX_TOKENS)
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+
+                if emitted:
+                    yield delta
+                    continue
+
+                prefix = "".join(parts).lstrip()
+                if _is_weak_prefix(prefix):
+                    _stream_stats.incr("early_aborts")
+                    yield None
+                    return
+
+                if len(prefix) >= STREAM_PREFIX_CHARS:
+                    emitted = True
+                    yield prefix
+        finally:
+            await deltas.aclose()
+
+    answer = "".join(parts).strip()
+
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, model, answer)
+
+    if not emitted:
+        # Stream ended inside the prefix window — judge the whole answer
+        if is_weak_answer(answer):
+            _stream_stats.incr("short_answers")
+            yield None
+        else:
+            yield answer
+
+
+async def astream_answer(prompt: str, use_cache: bool = True):
+    """
+    Stream an answer delta by delta, with early weak-answer detection on
+    the primary model and fallback to the second model.
+    """
+    start = time.perf_counter()
+    first = True
+
+    attempts = (
+        (PRIMARY_MODEL, PRIMARY_SYSTEM, 0.2, True),
+        (FALLBACK_MODEL, FALLBACK_SYSTEM, 0, False),
+    )
+
+    for model, system, temperature, judge in attempts:
+        weak = False
+
+        attempt = _astream_attempt(model, system, prompt, temperature, use_cache, judge)
+        try:
+            async for delta in attempt:
+                if delta is None:
+                    weak = True
+                    break
+                if first:
+                    _stream_stats.record(time.perf_counter() - start)
+                    first = False
+                yield delta
+        finally:
+            # Release the upstream stream (and concurrency slot) right away
+            await attempt.aclose()
+
+        if not weak:
+            return
+
+        _stream_stats.incr("fallback_used")
+
+
+def stream_answer(prompt: str, use_cache: bool = True):
+    """
+    Blocking generator over astream_answer() for sync consumers
+    (e.g. Streamlit's chat).
+    """
+    chunks = queue.Queue()
+    end = object()
+
+    async def pump():
+        try:
+            async for delta in astream_answer(prompt, use_cache=use_cache):
+                chunks.put(delta)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(end)
+
+    future = submit(pump())
+
+    try:
+        while True:
+            item = chunks.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
+
+
+def stream_stats() -> dict:
+    """Time-to-first-delta percentiles plus early-abort counters."""
+    return _stream_stats.summary()
+
+
+# -------------------------------------------------
+# Public API
+# -------------------------------------------------
+async def allm_answer(prompt: str, use_cache: bool = True, hedge: str | None = None) -> str:
+    """
+    Answer a prompt, retrying on the fallback model if the answer is weak.
+
+    use_cache=False bypasses the response cache for both attempts.
+    hedge selects a hedging mode (see HEDGE_MODES); defaults to CIP_LLM_HEDGE.
+    """
+    mode = hedge or HEDGE_MODE
+    if mode not in HEDGE_MODES:
+        raise ValueError(f"Unknown hedge mode: {mode!r} (expected one of {HEDGE_MODES})")
+
+    stats = _mode_stats[mode]
+    start = time.perf_counter()
+
+    if mode == "off":
+        answer = await _answer_sequential(prompt, stats, use_cache)
+    else:
+        answer = await _answer_hedged(prompt, mode, stats, use_cache)
+
+    stats.record(time.perf_counter() - start)
+    return answer
+
+
+async def allm_answer_many(
+    prompts: list[str],
+    return_exceptions: bool = False,
+    use_cache: bool = True,
+    hedge: str | None = None
+) -> list:
+    """
+    Answer several prompts concurrently (bounded by the adaptive
+    concurrency limit, at most MAX_CONCURRENCY).
+    Results keep the order of `prompts`.
+    """
+    return await asyncio.gather(
+        *(allm_answer(p, use_cache=use_cache, hedge=hedge) for p in prompts),
+        return_exceptions=return_exceptions
+    )
+
+
+async def allm_complete(
+    prompt: str,
+    system: str = PRIMARY_SYSTEM,
+    temperature: float = 0.2,
+    max_tokens: int = MAX_TOKENS,
+    use_cache: bool = True
+) -> str:
+    """
+    Raw primary-model completion with a custom system prompt and budget.
+    No weak-answer retry — for structured prompts (e.g. JSON output).
+    """
+    return await _acomplete(
+        PRIMARY_MODEL, system, prompt,
+        temperature=temperature, max_tokens=max_tokens, use_cache=use_cache
+    )
+
+
+def llm_answer(prompt: str, use_cache: bool = True, hedge: str | None = None) -> str:
+    return run_sync(allm_answer(prompt, use_cache=use_cache, hedge=hedge))
+
+
+def llm_answer_many(
+    prompts: list[str],
+    return_exceptions: bool = False,
+    use_cache: bool = True,
+    hedge: str | None = None
+) -> list:
+    return run_sync(allm_answer_many(
+        prompts, return_exceptions=return_exceptions, use_cache=use_cache, hedge=hedge
+    ))
@@ -0,0 +1,234 @@
+"""
+Persistent LLM response cache.
+
+SQLite-backed store of chat completions keyed by everything that shapes
+the output: (model, system prompt, user prompt, temperature, max_tokens).
+The primary model and the weak-answer fallback model therefore never
+share entries.
+
+Eviction:
+  • TTL  — entries older than `ttl_seconds` are treated as misses
+  • LRU  — once `max_entries` is exceeded, least recently read rows go
+            (read times are buffered and written with the next put)
+
+Environment:
+  CIP_LLM_CACHE=0              → disable the cache globally (bypass)
+  CIP_LLM_CACHE_PATH           → database file
+  CIP_LLM_CACHE_MAX_ENTRIES    → size cap (rows)
+  CIP_LLM_CACHE_TTL            → time-to-live in seconds (0 = never expire)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_CIP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_PATH = os.path.join(_CIP_ROOT, ".cache", "llm_responses.sqlite")
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+# Buffered last_access updates written without waiting for a put
+TOUCH_FLUSH_SIZE = 256
+
+
+class ResponseCache:
+    """
+    Thread-safe SQLite cache for LLM responses.
+
+    - get() / put() by request key; get() is a plain read (no commit)
+    - LRU + TTL eviction with a row cap
+    - hit / miss / eviction counters via stats()
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched: dict[str, float] = {}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+
+    # ---------------------------
+    # Keys
+    # ---------------------------
+    @staticmethod
+    def make_key(
+        model: str,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        payload = json.dumps(
+            [model, system, prompt, float(temperature), int(max_tokens)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ---------------------------
+    # Lookup / store
+    # ---------------------------
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+
+            if self._expired(created_at, now):
+                # Deleted by the next put's eviction pass (or overwritten)
+                self.misses += 1
+                return None
+
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touches()
+                self._conn.commit()
+            self.hits += 1
+            return response
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, model, response, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            self._touched.pop(key, None)
+            self._flush_touches()
+            self._evict(now)
+            self._conn.commit()
+
+    def _flush_touches(self) -> None:
+        """Caller holds the lock and commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def flush(self) -> None:
+        """Write buffered read times now."""
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+
+    # ---------------------------
+    # Eviction
+    # ---------------------------
+    def _evict(self, now: float) -> None:
+        """Caller holds the lock."""
+        if self.ttl_seconds:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (now - self.ttl_seconds,)
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - self.max_entries
+
+        if excess > 0:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    # ---------------------------
+    # Stats
+    # ---------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# -------------------------------------------------
+# Process-wide instance
+# -------------------------------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("CIP_LLM_CACHE", "1").lower() not in ("0", "false", "off", "no")
+
+
+def get_cache() -> ResponseCache | None:
+    """Shared cache instance, or None when disabled via CIP_LLM_CACHE=0."""
+    global _cache
+
+    if not cache_enabled():
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path=os.environ.get("CIP_LLM_CACHE_PATH", DEFAULT_PATH),
+                max_entries=int(os.environ.get("CIP_LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.environ.get("CIP_LLM_CACHE_TTL", DEFAULT_TTL_SECONDS))
+            )
+            # Keep buffered read times across restarts
+            atexit.register(_cache.flush)
+    return _cache
@@ -0,0 +1,93 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+
+While a request for a given key is in flight, every other caller asking
+for the same key awaits that one upstream call instead of issuing its own.
+Nothing is remembered after the call finishes — that is the response
+cache's job.
+"""
+
+import asyncio
+import threading
+import weakref
+
+
+class SingleFlight:
+    """
+    Per-event-loop request coalescer.
+
+      await flight.do(key, make_call)   # make_call: zero-arg coroutine factory
+
+    Counters:
+      leaders    — calls that actually went upstream
+      coalesced  — calls that joined an in-flight leader
+    """
+
+    def __init__(self):
+        self._inflight = weakref.WeakKeyDictionary()   # loop → {key: Future}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _calls(self) -> dict:
+        loop = asyncio.get_running_loop()
+        calls = self._inflight.get(loop)
+        if calls is None:
+            calls = self._inflight[loop] = {}
+        return calls
+
+    async def do(self, key: str, make_call):
+        calls = self._calls()
+
+        while key in calls:
+            future = calls[key]
+            with self._lock:
+                self.coalesced += 1
+            try:
+                # shield: a cancelled follower must not cancel the leader's call
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled (e.g. a hedged loser), not us —
+                # join the next in-flight call or lead a new one.
+                with self._lock:
+                    self.coalesced -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        calls[key] = future
+        with self._lock:
+            self.leaders += 1
+
+        try:
+            result = await make_call()
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Followers get the error; don't warn if there were none
+                    future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            calls.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_rate": self.coalesced / total if total else 0.0,
+            }
+
+
+_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _flight
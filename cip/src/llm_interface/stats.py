@@ -0,0 +1,64 @@
+"""
+Small latency bookkeeping helpers shared by the LLM interface.
+"""
+
+import threading
+from collections import deque
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile (q in [0, 100]); 0.0 for no data."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+class LatencyStats:
+    """
+    Rolling latency window plus free-form event counters.
+
+      stats.record(0.84)
+      stats.incr("hedges")
+      stats.summary()  →  {"count", "mean", "p50", "p95", "p99", <counters>}
+    """
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._counters: dict[str, int] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        return percentile(samples, q)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            counters = dict(self._counters)
+            count = self._count
+
+        return {
+            "count": count,
+            "mean": sum(samples) / len(samples) if samples else 0.0,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            **counters,
+        }
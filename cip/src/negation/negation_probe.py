@@ -1,5 +1,6 @@
+import asyncio
 import logging
-from llm_interface.real_llm import llm_answer
+from llm_interface.real_llm import allm_answer, run_sync
 from negation.rule_negator import negate_question
 from negation.nli_scorer import NLIScorer
 from negation.intent_gate import negation_confidence
@@ -16,12 +17,16 @@ class NegationProbe:
     - Guaranteed safe return structure
     """
 
-    def __init__(self):
-        self.nli = NLIScorer()
+    def __init__(self, nli: NLIScorer | None = None):
+        # Pass NLIScorer(cascade=True) to use the small-model-first cascade
+        self.nli = nli or NLIScorer()
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger("Module4")
 
     def run(self, question: str, original_answer: str) -> dict:
+        return run_sync(self.arun(question, original_answer))
+
+    async def arun(self, question: str, original_answer: str) -> dict:
 
         # Default safe return
         safe_output: dict = {
@@ -44,10 +49,11 @@ class NegationProbe:
             neg_question = negate_question(question)
 
             # Step 2: LLM answer
-            neg_answer = llm_answer(neg_question)
+            neg_answer = await allm_answer(neg_question)
 
-            # Step 3: MNLI contradiction
-            raw_score = self.nli.contradiction_score(
+            # Step 3: MNLI contradiction (off the event loop — CPU bound)
+            raw_score = await asyncio.to_thread(
+                self.nli.contradiction_score,
                 premise=original_answer,
                 hypothesis=neg_answer
             )
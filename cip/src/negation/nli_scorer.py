@@ -1,21 +1,113 @@
-import torch 
+import random
+import threading
+
+import numpy as np
+import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
+from preprocessing.batching import length_buckets
+from registry import model_registry as models
+
 # -------------------------------------------------
 # Device Setup (auto GPU if available)
 # -------------------------------------------------
 _DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 # -------------------------------------------------
-# Load model ONCE at module import
+# Models load lazily (once) through the model registry
 # -------------------------------------------------
 _MODEL_NAME = "roberta-large-mnli"
 
-_TOKENIZER = AutoTokenizer.from_pretrained(_MODEL_NAME)
-_MODEL = AutoModelForSequenceClassification.from_pretrained(_MODEL_NAME)
+# Small first-stage model for cascade mode
+SMALL_MODEL_NAME = "cross-encoder/nli-distilroberta-base"
+
+
+def _label_order(model) -> list[int]:
+    """
+    Model output indices for (contradiction, neutral, entailment).
+    MNLI checkpoints disagree on label order, so read it from the config.
+    """
+    labels = {str(v).lower(): int(k) for k, v in model.config.id2label.items()}
+    try:
+        return [labels["contradiction"], labels["neutral"], labels["entailment"]]
+    except KeyError:
+        raise ValueError(
+            f"Cannot map NLI labels {model.config.id2label} to contradiction/neutral/entailment"
+        )
+
+
+# Max |Δ contradiction probability| allowed for int8 on the TruthfulQA sample
+MAX_QUANT_DRIFT = 0.05
+
+
+def _model_device(model):
+    # Quantized models stay on CPU; ONNX models take CPU tensors
+    return getattr(model, "device", _DEVICE)
+
+
+def _load_quantized(model_name: str, tokenizer, max_drift: float, revision: str = "main"):
+    from transformers import AutoConfig
+    from inference.quantization import load_quantized, truthfulqa_sample
+
+    def load_fp32():
+        return AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision).eval()
+
+    def build_empty():
+        return AutoModelForSequenceClassification.from_config(
+            AutoConfig.from_pretrained(model_name, revision=revision)
+        ).eval()
+
+    def contradiction_drift(fp32, int8):
+        pairs = truthfulqa_sample()
+        order = _label_order(fp32)
+        ref = NLIScorer._score_bucketed(tokenizer, fp32, order, pairs, 16, NLIScorer.max_length)
+        new = NLIScorer._score_bucketed(tokenizer, int8, order, pairs, 16, NLIScorer.max_length)
+        return np.abs(ref[:, 0] - new[:, 0]).max()
+
+    model, quantized = load_quantized(
+        model_name, load_fp32, build_empty, contradiction_drift,
+        max_drift, metric="max_abs_contradiction", revision=revision
+    )
+    if not quantized:
+        # Gate refused int8: place the fp32 model like the plain path
+        model.to(_DEVICE)
+    return model
+
+
+def _loader(model_name: str, backend: str = "torch", quantized: bool = False,
+            max_drift: float = MAX_QUANT_DRIFT, revision: str = "main"):
+    def load():
+        if backend == "onnx":
+            from inference.onnx_backend import OnnxModel, load_tokenizer
+            model = OnnxModel(model_name, revision=revision)
+            return load_tokenizer(model_name, revision=revision), model, _label_order(model)
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+
+        if quantized:
+            model = _load_quantized(model_name, tokenizer, max_drift, revision)
+            return tokenizer, model, _label_order(model)
+
+        model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision)
+        model.to(_DEVICE)
+        model.eval()
+        return tokenizer, model, _label_order(model)
+    return load
+
+
+def _register(model_name: str, backend: str = "torch", quantized: bool = False,
+              max_drift: float = MAX_QUANT_DRIFT, revision: str = "main") -> str:
+    # The drift gate decides int8 vs fp32, so it is part of the identity
+    variant = f".int8@{max_drift:g}" if quantized else ""
+    key = f"nli.{backend}{variant}.{model_name}@{revision}"
+    models.register(key, _loader(model_name, backend, quantized, max_drift, revision))
+    return key
 
-_MODEL.to(_DEVICE)
-_MODEL.eval()
+
+def _nli(model_name: str, backend: str = "torch", quantized: bool = False,
+         max_drift: float = MAX_QUANT_DRIFT, revision: str = "main"):
+    """(tokenizer, model, label_order) for an MNLI checkpoint."""
+    return models.get(_register(model_name, backend, quantized, max_drift, revision))
 
 
 class NLIScorer:
@@ -29,6 +121,26 @@ class NLIScorer:
     - entailment_score()
     - neutral_score()
     - full_scores()  (single forward pass for efficiency)
+    - score_batch()  (many pairs, length-bucketed + dynamically padded)
+
+    Cascade mode (cascade=True):
+    - A small MNLI model scores every pair first
+    - Pairs whose top probability is below `margin` escalate to
+      roberta-large-mnli
+    - `audit_rate` also runs the large model on a random share of
+      non-escalated pairs to measure agreement
+    - cascade_stats() reports escalation rate and agreement
+
+    backend="onnx" runs both models on ONNX Runtime
+    (export first: python -m inference.onnx_backend export nli nli-small;
+    nli-small is only needed with cascade=True)
+
+    quantized=True uses int8 dynamic quantization (CPU), cached on disk
+    and only enabled if contradiction scores on a TruthfulQA sample stay
+    within `max_drift` of fp32 (see inference/quantization.py)
+
+    revision pins the roberta-large-mnli checkpoint (weights, quantized
+    artifacts and ONNX export); the small model uses its default branch
     """
 
     # MNLI label mapping
@@ -39,6 +151,79 @@ class NLIScorer:
     neutral_idx = 1
     entailment_idx = 2
 
+    # Token cap for (premise, hypothesis) pairs
+    max_length = 512
+
+    def __init__(
+        self,
+        cascade: bool = False,
+        small_model: str = SMALL_MODEL_NAME,
+        margin: float = 0.9,
+        audit_rate: float = 0.0,
+        seed: int = 42,
+        backend: str = "torch",
+        quantized: bool = False,
+        max_drift: float = MAX_QUANT_DRIFT,
+        revision: str = "main"
+    ):
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"backend must be 'torch' or 'onnx', got {backend!r}")
+        if quantized and backend != "torch":
+            raise ValueError("quantized=True is only supported with backend='torch'")
+
+        self.backend = backend
+        self.quantized = quantized
+        self.max_drift = max_drift
+        self.revision = revision
+
+        # Register up front so warm_up() loads exactly the variants in use
+        _register(_MODEL_NAME, backend, quantized, max_drift, revision)
+        if cascade:
+            _register(small_model, backend, quantized, max_drift)
+        self.cascade = cascade
+        self.small_model = small_model
+        self.margin = margin
+        self.audit_rate = audit_rate
+
+        self._rng = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "pairs": 0,
+            "escalated": 0,
+            "escalated_agree": 0,
+            "audited": 0,
+            "audited_agree": 0,
+            "audited_abs_diff": 0.0,
+        }
+
+    def _large(self):
+        return _nli(_MODEL_NAME, self.backend, self.quantized, self.max_drift, self.revision)
+
+    def _small(self):
+        return _nli(self.small_model, self.backend, self.quantized, self.max_drift)
+
+    # -------------------------------------------------
+    # Forward passes
+    # -------------------------------------------------
+    @staticmethod
+    @torch.no_grad()
+    def _forward(tokenizer, model, label_order, premises, hypotheses, max_length):
+        inputs = tokenizer(
+            premises,
+            hypotheses,
+            return_tensors="pt",
+            truncation=True,
+            max_length=max_length,
+            padding=True
+        )
+
+        inputs = {k: v.to(_model_device(model)) for k, v in inputs.items()}
+
+        logits = model(**inputs).logits
+        probs = torch.softmax(logits, dim=-1)
+
+        return probs[:, label_order]  # shape: (N, 3) canonical order
+
     @torch.no_grad()
     def _predict(self, premise: str, hypothesis: str):
         """
@@ -46,20 +231,32 @@ class NLIScorer:
         Returns softmax probabilities tensor of shape (3,)
         """
 
-        inputs = _TOKENIZER(
-            premise,
-            hypothesis,
-            return_tensors="pt",
-            truncation=True,
-            padding=True
-        )
+        if self.cascade:
+            small = self._small()
+            probs = self._forward(*small, [premise], [hypothesis], self.max_length)[0]
 
-        inputs = {k: v.to(_DEVICE) for k, v in inputs.items()}
+            escalate = float(probs.max()) < self.margin
+            audit = not escalate and self.audit_rate > 0 and self._rng.random() < self.audit_rate
 
-        logits = _MODEL(**inputs).logits
-        probs = torch.softmax(logits, dim=-1)
+            if not (escalate or audit):
+                self._record(1, 0, 0, 0, 0, 0.0)
+                return probs
 
-        return probs[0]  # shape: (3,)
+            large = self._forward(
+                *self._large(), [premise], [hypothesis], self.max_length
+            )[0]
+            agree = int(probs.argmax() == large.argmax())
+
+            if escalate:
+                self._record(1, 1, agree, 0, 0, 0.0)
+                return large
+
+            self._record(1, 0, 0, 1, agree, float((probs - large).abs().max()))
+            return probs
+
+        return self._forward(
+            *self._large(), [premise], [hypothesis], self.max_length
+        )[0]
 
     # -------------------------------------------------
     # Backward Compatible Method
@@ -94,4 +291,133 @@ class NLIScorer:
             "contradiction": float(probs[self.contradiction_idx].cpu()),
             "neutral": float(probs[self.neutral_idx].cpu()),
             "entailment": float(probs[self.entailment_idx].cpu())
-        }
\ No newline at end of file
+        }
+
+    # -------------------------------------------------
+    # Batched API
+    # -------------------------------------------------
+    @staticmethod
+    @torch.no_grad()
+    def _score_bucketed(tokenizer, model, label_order, pairs, batch_size, max_length) -> np.ndarray:
+        out = np.zeros((len(pairs), 3), dtype=np.float32)
+        if not pairs:
+            return out
+
+        encoded = tokenizer(
+            [p for p, _ in pairs],
+            [h for _, h in pairs],
+            truncation=True,
+            max_length=max_length,
+            padding=False
+        )
+
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+        for idx in length_buckets(lengths, batch_size):
+            batch = tokenizer.pad(
+                {key: [encoded[key][i] for i in idx] for key in encoded.keys()},
+                padding="longest",
+                return_tensors="pt"
+            )
+            batch = {k: v.to(_model_device(model)) for k, v in batch.items()}
+
+            logits = model(**batch).logits
+            probs = torch.softmax(logits, dim=-1)[:, label_order]
+            out[idx] = probs.float().cpu().numpy()
+
+        return out
+
+    @torch.no_grad()
+    def score_batch(
+        self,
+        pairs: list[tuple[str, str]],
+        batch_size: int = 32,
+        max_length: int | None = None
+    ) -> np.ndarray:
+        """
+        Score many (premise, hypothesis) pairs.
+
+        - Tokenizes everything once (truncated to max_length)
+        - Sorts by token length so each batch holds similar lengths
+        - Pads each batch only to its own longest pair
+        - In cascade mode only uncertain pairs reach roberta-large
+
+        Returns float32 array [N, 3] in label order
+        (contradiction, neutral, entailment), aligned with `pairs`.
+        """
+        max_length = max_length or self.max_length
+
+        if not self.cascade:
+            return self._score_bucketed(
+                *self._large(), pairs, batch_size, max_length
+            )
+
+        small = self._score_bucketed(
+            *self._small(), pairs, batch_size, max_length
+        )
+        out = small.copy()
+        if not pairs:
+            return out
+
+        escalate = small.max(axis=1) < self.margin
+        audit = ~escalate & (
+            np.array([self._rng.random() for _ in pairs]) < self.audit_rate
+        )
+        rerun = np.flatnonzero(escalate | audit)
+
+        large = self._score_bucketed(
+            *self._large(),
+            [pairs[i] for i in rerun], batch_size, max_length
+        )
+
+        agree = small[rerun].argmax(axis=1) == large.argmax(axis=1)
+        is_esc = escalate[rerun]
+
+        # Escalated pairs take the large model's scores; audited keep small
+        out[rerun[is_esc]] = large[is_esc]
+
+        self._record(
+            len(pairs),
+            int(is_esc.sum()),
+            int(agree[is_esc].sum()),
+            int((~is_esc).sum()),
+            int(agree[~is_esc].sum()),
+            float(np.abs(small[rerun][~is_esc] - large[~is_esc]).max(axis=1).sum())
+        )
+        return out
+
+    # -------------------------------------------------
+    # Cascade statistics
+    # -------------------------------------------------
+    def _record(self, pairs, escalated, escalated_agree, audited, audited_agree, abs_diff):
+        with self._stats_lock:
+            self._stats["pairs"] += pairs
+            self._stats["escalated"] += escalated
+            self._stats["escalated_agree"] += escalated_agree
+            self._stats["audited"] += audited
+            self._stats["audited_agree"] += audited_agree
+            self._stats["audited_abs_diff"] += abs_diff
+
+    def cascade_stats(self) -> dict:
+        """
+        escalation_rate     share of pairs that needed roberta-large
+        agreement_escalated small-vs-large argmax agreement on escalated pairs
+        agreement_audited   same, on the random audit sample of confident
+                            pairs (estimates agreement where we skip large)
+        audited_max_diff    mean max |Δprob| on audited pairs
+        """
+        with self._stats_lock:
+            s = dict(self._stats)
+
+        def ratio(a, b):
+            return a / b if b else None
+
+        return {
+            "pairs": s["pairs"],
+            "escalated": s["escalated"],
+            "escalation_rate": ratio(s["escalated"], s["pairs"]),
+            "agreement_escalated": ratio(s["escalated_agree"], s["escalated"]),
+            "audited": s["audited"],
+            "agreement_audited": ratio(s["audited_agree"], s["audited"]),
+            "audited_max_diff": ratio(s["audited_abs_diff"], s["audited"]),
+        }
@@ -2,11 +2,24 @@
 
 import spacy
 
-nlp = spacy.load("en_core_web_sm")
+from registry import model_registry as models
+
+models.register("spacy.en_core_web_sm", lambda: spacy.load("en_core_web_sm"))
+
+
+def get_nlp():
+    return models.get("spacy.en_core_web_sm")
+
+
+def __getattr__(name):
+    # Backward compatible `rule_negator.nlp`
+    if name == "nlp":
+        return get_nlp()
+    raise AttributeError(name)
 
 
 def negate_question(question: str) -> str:
-    doc = nlp(question)
+    doc = get_nlp()(question)
 
     tokens = [token.text for token in doc]
     lower_tokens = [token.text.lower() for token in doc]
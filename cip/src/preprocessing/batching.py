@@ -0,0 +1,62 @@
+# cip/src/preprocessing/batching.py
+
+"""
+Length-bucketing scheduler for transformer batches.
+
+Sorting by token length keeps every batch close to uniform, so dynamic
+padding (pad each batch to its own longest item) wastes almost nothing.
+"""
+
+import numpy as np
+
+
+def length_buckets(
+    lengths,
+    batch_size: int = 32,
+    max_tokens: int | None = None
+) -> list[np.ndarray]:
+    """
+    Group item indices into batches of similar length.
+
+    - Items are ordered by length (stable), shortest first
+    - A batch holds at most `batch_size` items
+    - With `max_tokens`, a batch also stops growing once
+      rows × longest length would exceed it (long items get small batches)
+
+    Returns a list of index arrays covering every item exactly once.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind="stable")
+
+    batches = []
+    current = []
+
+    for i in order:
+        # Sorted ascending → item i is the longest in the batch so far
+        full = len(current) == batch_size
+        over = max_tokens is not None and (len(current) + 1) * int(lengths[i]) > max_tokens
+
+        if current and (full or over):
+            batches.append(np.array(current))
+            current = []
+
+        current.append(i)
+
+    if current:
+        batches.append(np.array(current))
+
+    return batches
+
+
+def pad_batch(sequences: list[list[int]], pad_id: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Right-pad token id lists to the longest one → (input_ids, attention_mask) int64."""
+    width = max((len(s) for s in sequences), default=0)
+
+    input_ids = np.full((len(sequences), width), pad_id, dtype=np.int64)
+    attention_mask = np.zeros((len(sequences), width), dtype=np.int64)
+
+    for row, seq in enumerate(sequences):
+        input_ids[row, :len(seq)] = seq
+        attention_mask[row, :len(seq)] = 1
+
+    return input_ids, attention_mask
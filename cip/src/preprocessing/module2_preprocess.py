@@ -1,16 +1,29 @@
 import re
 from transformers import DistilBertTokenizerFast
 from llm_interface.real_llm import llm_answer
+from registry import model_registry as models
 
 
 # -------------------------------------------------
-# Step 2.3 – Load tokenizer (ONCE per program)
+# Step 2.3 – Load tokenizer (ONCE per program, on first use)
 # -------------------------------------------------
-tokenizer = DistilBertTokenizerFast.from_pretrained(
-    "distilbert-base-uncased"
+models.register(
+    "tokenizer.distilbert-base-uncased",
+    lambda: DistilBertTokenizerFast.from_pretrained("distilbert-base-uncased")
 )
 
 
+def get_tokenizer() -> DistilBertTokenizerFast:
+    return models.get("tokenizer.distilbert-base-uncased")
+
+
+def __getattr__(name):
+    # Backward compatible `module2_preprocess.tokenizer`
+    if name == "tokenizer":
+        return get_tokenizer()
+    raise AttributeError(name)
+
+
 # -------------------------------------------------
 # Step 2.1 – Basic text cleaning
 # -------------------------------------------------
@@ -34,15 +47,27 @@ def clean_text(text: str) -> str:
     return text
 
 
+def qa_text(question: str, answer: str) -> str:
+    """QA pair formation: cleaned "question [SEP] answer"."""
+    return clean_text(question) + " [SEP] " + clean_text(answer)
+
+
 # -------------------------------------------------
 # Module 2 main entry point
 # -------------------------------------------------
-def module2_process(question: str, answer: str | None = None) -> dict:
+# Token cap for a QA pair (DistilBERT position limit)
+MAX_LENGTH = 512
+
+
+def module2_process(question: str, answer: str | None = None, padding: str = "longest") -> dict:
     """
     Module 2: Text Preprocessing
 
     If answer is None → calls LLM (inference mode)
     If answer is provided → uses given answer (training mode)
+
+    padding="longest" (default) keeps the pair at its real length;
+    pass padding="max_length" for the old fixed 512-token tensors.
     """
 
     # ---------------------------
@@ -67,11 +92,11 @@ def module2_process(question: str, answer: str | None = None) -> dict:
     # ---------------------------
     # Step 4 – Tokenization
     # ---------------------------
-    encoded = tokenizer(
+    encoded = get_tokenizer()(
         qa_text,
         truncation=True,
-        padding="max_length",
-        max_length=512,
+        padding=padding,
+        max_length=MAX_LENGTH,
         return_tensors="pt"
     )
 
@@ -82,3 +107,45 @@ def module2_process(question: str, answer: str | None = None) -> dict:
         "input_ids": encoded["input_ids"],
         "attention_mask": encoded["attention_mask"]
     }
+
+
+# -------------------------------------------------
+# Batch API (training mode — answers provided)
+# -------------------------------------------------
+def module2_process_batch(pairs: list[tuple[str, str]]) -> dict:
+    """
+    Module 2 for many (question, answer) pairs at once.
+
+    - Cleans and forms QA texts exactly like module2_process
+    - Tokenizes all pairs in one fast-tokenizer call
+    - No padding: "input_ids" are per-pair lists, padded later per
+      batch (see preprocessing/batching.py)
+    """
+    questions = [clean_text(q) for q, _ in pairs]
+    answers = [clean_text(a) for _, a in pairs]
+    # Same formation as module2_process — qa_text is the embedding-cache key
+    qa_texts = [qa_text(q, a) for q, a in pairs]
+
+    input_ids = tokenize_batch(qa_texts)
+
+    return {
+        "questions": questions,
+        "answers": answers,
+        "qa_texts": qa_texts,
+        "input_ids": input_ids,
+        "lengths": [len(ids) for ids in input_ids]
+    }
+
+
+def tokenize_batch(qa_texts: list[str]) -> list[list[int]]:
+    """Unpadded token ids for many QA texts (one fast-tokenizer call)."""
+    if not qa_texts:
+        return []
+
+    encoded = get_tokenizer()(
+        qa_texts,
+        truncation=True,
+        max_length=MAX_LENGTH,
+        padding=False
+    )
+    return encoded["input_ids"]
@@ -0,0 +1,153 @@
+"""
+Central lazy model registry.
+
+Heavy artifacts (transformer weights, spaCy pipelines, classifiers) are
+registered by name with a zero-argument loader and only loaded on first
+get(). warm_up() loads a set of them in parallel threads, and
+startup_report() shows where load time went, per component.
+
+    from registry import model_registry as models
+
+    models.register("spacy.en_core_web_sm", lambda: spacy.load("en_core_web_sm"))
+    nlp = models.get("spacy.en_core_web_sm")
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("ModelRegistry")
+
+
+class _Entry:
+    def __init__(self, name: str, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.loaded = False
+        self.seconds = None
+        self.thread = None
+        self.error = None
+        self.lock = threading.Lock()
+
+
+_entries: dict[str, _Entry] = {}
+_registry_lock = threading.Lock()
+
+
+def register(name: str, loader) -> None:
+    """Register `loader` under `name`. Re-registering an existing name is a no-op."""
+    with _registry_lock:
+        if name not in _entries:
+            _entries[name] = _Entry(name, loader)
+
+
+def registered() -> list[str]:
+    with _registry_lock:
+        return list(_entries)
+
+
+def is_loaded(name: str) -> bool:
+    entry = _entries.get(name)
+    return entry is not None and entry.loaded
+
+
+def get(name: str):
+    """Return the loaded artifact, loading it (once, thread-safely) if needed."""
+    try:
+        entry = _entries[name]
+    except KeyError:
+        raise KeyError(f"No model registered under {name!r}") from None
+
+    if entry.loaded:
+        return entry.value
+
+    with entry.lock:
+        if not entry.loaded:
+            start = time.perf_counter()
+            try:
+                entry.value = entry.loader()
+            except Exception as e:
+                entry.error = repr(e)
+                raise
+            entry.seconds = time.perf_counter() - start
+            entry.thread = threading.current_thread().name
+            entry.loaded = True
+            entry.error = None
+            logger.info(f"Loaded {name} in {entry.seconds:.2f}s")
+
+    return entry.value
+
+
+def unload(name: str) -> None:
+    """Drop a loaded artifact so the next get() reloads it."""
+    entry = _entries.get(name)
+    if entry is None:
+        return
+    with entry.lock:
+        entry.value = None
+        entry.loaded = False
+        entry.seconds = None
+        entry.thread = None
+
+
+def warm_up(names: list[str] | None = None, parallel: bool = True, max_workers: int | None = None) -> dict:
+    """
+    Load the given (default: all registered) models now.
+    Returns {name: seconds or error string}; failures are logged, not raised.
+    """
+    names = registered() if names is None else list(names)
+    results = {}
+
+    def load(name):
+        try:
+            get(name)
+            return name, _entries[name].seconds
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            return name, f"error: {e}"
+
+    if parallel and len(names) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers or len(names), thread_name_prefix="warmup") as pool:
+            for name, outcome in pool.map(load, names):
+                results[name] = outcome
+    else:
+        for name in names:
+            name, outcome = load(name)
+            results[name] = outcome
+
+    return results
+
+
+def startup_report() -> dict:
+    """{name: {"loaded", "seconds", "thread", "error"}} for every registered model."""
+    with _registry_lock:
+        entries = list(_entries.values())
+
+    return {
+        e.name: {
+            "loaded": e.loaded,
+            "seconds": e.seconds,
+            "thread": e.thread,
+            "error": e.error,
+        }
+        for e in entries
+    }
+
+
+def print_startup_report() -> None:
+    report = startup_report()
+    total = sum(r["seconds"] or 0.0 for r in report.values())
+
+    print("\nModel load times")
+    print("-------------------------------------------------")
+    for name, r in sorted(report.items(), key=lambda kv: -(kv[1]["seconds"] or 0.0)):
+        if r["loaded"]:
+            status = f"{r['seconds']:7.2f}s  [{r['thread']}]"
+        elif r["error"]:
+            status = f"  failed  {r['error']}"
+        else:
+            status = "  not loaded"
+        print(f"{name:<40} {status}")
+    print(f"{'total (sum of loads)':<40} {total:7.2f}s")
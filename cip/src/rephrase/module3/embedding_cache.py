@@ -0,0 +1,98 @@
+"""
+Process-wide LRU cache of normalized sentence embeddings.
+
+Module 3 embeds the same strings again and again (the original answer
+for every paraphrase, repeated GUI questions, paraphrase candidates).
+Entries are keyed by (embedding model, text) and hold float32 unit
+vectors, so cosine similarity is a plain dot product.
+
+Environment:
+  CIP_SENTENCE_CACHE_SIZE   → max cached strings (default 4096)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class EmbeddingLRU:
+    """
+    Thread-safe LRU of normalized embeddings.
+
+    - encode(): cached rows + one batched encode for the misses
+    - hit / miss counters via stats()
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, embedder, model_key: str, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        """float32 [len(texts), dim] of L2-normalized embeddings."""
+        found: dict[int, np.ndarray] = {}
+        missing: dict[str, list[int]] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                vec = self._data.get((model_key, text))
+                if vec is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    self._data.move_to_end((model_key, text))
+                    found[i] = vec
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+
+        if missing:
+            unique = list(missing)
+            encoded = np.asarray(
+                embedder.encode(
+                    unique,
+                    batch_size=batch_size,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                ),
+                dtype=np.float32
+            )
+
+            with self._lock:
+                for text, vec in zip(unique, encoded):
+                    for i in missing[text]:
+                        found[i] = vec
+                    self._data[(model_key, text)] = vec
+                    self._data.move_to_end((model_key, text))
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[i] for i in range(len(texts))])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = EmbeddingLRU(int(os.environ.get("CIP_SENTENCE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)))
+
+
+def get_sentence_cache() -> EmbeddingLRU:
+    return _cache
@@ -1,9 +1,22 @@
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import asyncio
 import logging
+import math
 
-from rephrase.module3.rephraser import rephrase_question
-from llm_interface.real_llm import llm_answer
+import numpy as np
+
+from fusion.fusion_layer import CONSISTENCY_STRONG, CONSISTENCY_MODERATE
+
+from rephrase.module3.embedding_cache import get_sentence_cache
+from rephrase.module3.rephraser import (
+    arephrase_question,
+    arephrase_and_answer,
+    atop_up_paraphrases,
+    distinct_paraphrases,
+)
+from rephrase.module3.rule_paraphraser import rule_paraphrases
+from llm_interface.real_llm import allm_answer, run_sync
+from registry import model_registry as models
 
 
 class RephraseConsistencyAnalyzer:
@@ -14,61 +27,323 @@ class RephraseConsistencyAnalyzer:
     - Always attempts paraphrasing
     - Always returns float consistency_score
     - Exception safe
+    - Paraphrase answers are requested concurrently
+    - fused=True: paraphrases + answers in one LLM call, falling back
+      to the separate calls if the JSON cannot be parsed or holds fewer
+      than num_paraphrases usable items. The answers
+      arrive with the paraphrases, so answer_timeout, quorum, adaptive
+      and dedup do not apply to a fused run
+    - backend="onnx": MiniLM runs on ONNX Runtime
+    - Original answer encoded once, rephrased answers in one batch;
+      embeddings are shared through a process-wide LRU
+    - answer_timeout: per-paraphrase deadline (seconds); quorum: score
+      as soon as this many answers arrived and cancel the rest.
+      "paraphrase_status" records ok / timeout / error / cancelled
+    - adaptive=True: answer paraphrases in waves of `wave_size` and stop
+      once the running mean is clearly on one side of each fusion
+      threshold (0.3 / 0.5); num_paraphrases is then the max-k cap
+    - dedup_threshold (opt-in, e.g. 0.95): near-duplicate LLM
+      paraphrases (cosine ≥ threshold to the question or to each other)
+      are dropped before any answer call; `overgenerate` extra
+      candidates are requested up front and one top-up call fills any
+      remaining gap. Rule paraphrases skip it (already distinct by
+      normalized text)
+    - paraphraser="rules": paraphrases from local spaCy rewrite rules
+      instead of an LLM call (falls back to the LLM when no rule
+      applies). Can be overridden per call: arun(..., paraphraser=...)
     """
 
     def __init__(
         self,
         embedding_model: str = "all-MiniLM-L6-v2",
         num_paraphrases: int = 3,
-        enable_logging: bool = True
+        enable_logging: bool = True,
+        fused: bool = False,
+        backend: str = "torch",
+        answer_timeout: float | None = None,
+        quorum: int | None = None,
+        adaptive: bool = False,
+        wave_size: int = 1,
+        prior_std: float = 0.15,
+        z: float = 1.0,
+        dedup_threshold: float | None = None,
+        overgenerate: int = 2,
+        paraphraser: str = "llm"
     ):
-        self.embedder = SentenceTransformer(embedding_model)
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"backend must be 'torch' or 'onnx', got {backend!r}")
+        _check_paraphraser(paraphraser)
+
+        self.embedding_model = embedding_model
+        self.backend = backend
+        self._registry_key = f"sentence-transformer.{backend}.{embedding_model}"
+        models.register(self._registry_key, self._load_embedder)
         self.k = num_paraphrases
+        self.fused = fused
+        self.answer_timeout = answer_timeout
+        self.quorum = quorum
+        self.adaptive = adaptive
+        self.wave_size = wave_size
+        self.prior_std = prior_std
+        self.z = z
+        self.dedup_threshold = dedup_threshold
+        self.overgenerate = overgenerate
+        self.paraphraser = paraphraser
 
         if enable_logging:
             logging.basicConfig(level=logging.INFO)
 
         self.logger = logging.getLogger("Module3-RephraseConsistency")
 
+    def _load_embedder(self):
+        if self.backend == "onnx":
+            from inference.onnx_backend import OnnxSentenceEncoder
+            return OnnxSentenceEncoder(self.embedding_model)
+        return SentenceTransformer(self.embedding_model)
+
+    @property
+    def embedder(self) -> SentenceTransformer:
+        # Loaded on first use, shared by every analyzer with the same model
+        return models.get(self._registry_key)
+
     # ---------------------------
     # Embedding similarity
     # ---------------------------
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Normalized embeddings [N, dim] (cached across analyzers)."""
+        return get_sentence_cache().encode(self.embedder, self._registry_key, texts)
+
+    def _similarities(self, original: str, answers: list[str]) -> np.ndarray:
+        """Cosine similarity of each answer to `original` (one matrix product)."""
+        if not answers:
+            return np.zeros(0, dtype=np.float32)
+        emb = self.embed([original] + answers)
+        return emb[1:] @ emb[0]
+
     def _embed_similarity(self, a: str, b: str) -> float:
-        e1 = self.embedder.encode([a])
-        e2 = self.embedder.encode([b])
-        return float(cosine_similarity(e1, e2)[0][0])
+        return float(self._similarities(a, [b])[0])
 
     # ---------------------------
-    # Main entry point
+    # Paraphrase answering
     # ---------------------------
-    def run(self, question: str, original_answer: str) -> dict:
+    async def _answer_paraphrases(self, paraphrases: list[str]) -> tuple[list, list[str]]:
+        """
+        Answer all paraphrases concurrently.
+
+        Returns (answers, status) aligned with `paraphrases`; answers[i]
+        is None unless status[i] == "ok".
+        """
+        n = len(paraphrases)
+        quorum = min(self.quorum or n, n)
+
+        answers = [None] * n
+        status = ["pending"] * n
+
+        tasks = {
+            asyncio.ensure_future(asyncio.wait_for(allm_answer(p), self.answer_timeout)): i
+            for i, p in enumerate(paraphrases)
+        }
+        pending = set(tasks)
+        answered = 0
 
         try:
-            # Step 1: Generate paraphrases
-            paraphrases = rephrase_question(question, k=self.k)
+            while pending and answered < quorum:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    i = tasks[task]
+                    try:
+                        answers[i] = task.result()
+                        status[i] = "ok"
+                        answered += 1
+                    except asyncio.TimeoutError:
+                        status[i] = "timeout"
+                    except Exception as e:
+                        status[i] = "error"
+                        self.logger.debug(f"Paraphrase answer failed: {e}")
+        finally:
+            # Quorum reached (or caller cancelled): stop the stragglers
+            for task in pending:
+                task.cancel()
+                status[tasks[task]] = "cancelled"
 
-            if not paraphrases:
-                return {
-                    "consistency_score": 0.0,
-                    "paraphrases": [],
-                    "rephrased_answers": [],
-                    "reason": "no_paraphrases_generated"
-                }
+        return answers, status
 
-            scores = []
-            answers = []
+    # ---------------------------
+    # Paraphrase generation + dedup
+    # ---------------------------
+    async def _generate_paraphrases(self, question: str, paraphraser: str) -> tuple[list[str], str]:
+        """
+        (up to k paraphrases distinct from the question and each other,
+        source actually used: "rules" or "llm").
+        """
+        if paraphraser == "rules":
+            try:
+                paraphrases = await asyncio.to_thread(rule_paraphrases, question, self.k)
+            except Exception as e:
+                self.logger.warning(f"Rule paraphraser failed: {e}")
+                paraphrases = []
+
+            if paraphrases:
+                return paraphrases, "rules"
+            self.logger.info("No paraphrase rule applies — falling back to the LLM")
+
+        return await self._llm_paraphrases(question), "llm"
+
+    async def _llm_paraphrases(self, question: str) -> list[str]:
+        if self.dedup_threshold is None:
+            return await arephrase_question(question, k=self.k)
+
+        candidates = await arephrase_question(question, k=self.k + self.overgenerate)
+
+        try:
+            kept = await asyncio.to_thread(
+                distinct_paraphrases, question, candidates, self.embed, self.dedup_threshold
+            )
+        except Exception as e:
+            self.logger.warning(f"Paraphrase dedup failed: {e}")
+            return candidates[:self.k]
+
+        if len(kept) < self.k:
+            try:
+                extra = await atop_up_paraphrases(question, self.k - len(kept), avoid=candidates)
+                kept = await asyncio.to_thread(
+                    distinct_paraphrases, question, kept + extra, self.embed, self.dedup_threshold
+                )
+                candidates = candidates + extra
+            except Exception as e:
+                self.logger.warning(f"Paraphrase top-up failed: {e}")
+
+        if len(kept) < len(candidates):
+            self.logger.info(f"Dedup kept {len(kept)} of {len(candidates)} paraphrases")
 
-            # Step 2: Re-query LLM for each paraphrase
-            for q_re in paraphrases:
+        return kept[:self.k]
+
+    # ---------------------------
+    # Sequential early stopping
+    # ---------------------------
+    def _decisive(self, scores: list[float]) -> bool:
+        """
+        True once mean ± z·SE lies on one side of both fusion thresholds.
+        The std is floored at `prior_std`, so one sample is only decisive
+        when it is far from 0.3 and 0.5.
+        """
+        n = len(scores)
+        if n == 0:
+            return False
+
+        mean = float(np.mean(scores))
+        std = max(float(np.std(scores, ddof=1)) if n > 1 else 0.0, self.prior_std)
+        margin = self.z * std / math.sqrt(n)
+
+        return all(
+            abs(mean - t) >= margin
+            for t in (CONSISTENCY_STRONG, CONSISTENCY_MODERATE)
+        )
+
+    async def _answer_adaptive(
+        self, paraphrases: list[str], original_answer: str
+    ) -> tuple[list, list[str], list[float]]:
+        """Answer paraphrases wave by wave until the score is decisive."""
+        answers = [None] * len(paraphrases)
+        status = ["skipped"] * len(paraphrases)
+        scores = []
+
+        for start in range(0, len(paraphrases), self.wave_size):
+            wave = paraphrases[start:start + self.wave_size]
+            results, wave_status = await self._answer_paraphrases(wave)
+
+            answers[start:start + len(wave)] = results
+            status[start:start + len(wave)] = wave_status
+
+            ok = [a for a in results if isinstance(a, str)]
+            if ok:
                 try:
-                    a_re = llm_answer(q_re)
-                    sim = self._embed_similarity(original_answer, a_re)
+                    sims = await asyncio.to_thread(self._similarities, original_answer, ok)
+                except Exception as e:
+                    # Keep the answers already paid for; stop asking for more
+                    self.logger.warning(f"Similarity failed: {e}")
+                    break
+                scores.extend(float(s) for s in sims)
+
+            if self._decisive(scores):
+                break
 
-                    scores.append(sim)
-                    answers.append(a_re)
+        return answers, status, scores
 
-                except Exception:
-                    continue
+    # ---------------------------
+    # Main entry point
+    # ---------------------------
+    def run(self, question: str, original_answer: str, paraphraser: str | None = None) -> dict:
+        return run_sync(self.arun(question, original_answer, paraphraser=paraphraser))
+
+    async def arun(self, question: str, original_answer: str, paraphraser: str | None = None) -> dict:
+
+        paraphraser = paraphraser or self.paraphraser
+        _check_paraphraser(paraphraser)
+
+        try:
+            pairs = None
+            mode = "separate"
+            source = "llm"
+
+            # Step 1+2 (fused): paraphrases and their answers in one call
+            # (not with local paraphrases — their answers are separate calls anyway)
+            if self.fused and paraphraser == "llm":
+                try:
+                    pairs = await arephrase_and_answer(question, k=self.k)
+                except Exception as e:
+                    self.logger.warning(f"Fused rephrase failed: {e}")
+
+                # A short reply would score on fewer answers than asked for
+                if pairs and len(pairs) >= self.k:
+                    mode = "fused"
+                else:
+                    got = len(pairs) if pairs else 0
+                    self.logger.info(
+                        f"Fused response unusable ({got} of {self.k} items) — falling back to separate calls"
+                    )
+                    pairs = None
+
+            if pairs:
+                paraphrases = [p for p, _ in pairs]
+                results = [a for _, a in pairs]
+                status = ["ok"] * len(pairs)
+            else:
+                # Step 1: Generate paraphrases
+                paraphrases, source = await self._generate_paraphrases(question, paraphraser)
+
+                if not paraphrases:
+                    return {
+                        "consistency_score": 0.0,
+                        "paraphrases": [],
+                        "rephrased_answers": [],
+                        "reason": "no_paraphrases_generated"
+                    }
+
+                # Step 2: Re-query LLM — all paraphrases at once, or
+                # wave by wave until the score is decisive
+                if self.adaptive:
+                    mode = "adaptive"
+                    results, status, scores = await self._answer_adaptive(
+                        paraphrases, original_answer
+                    )
+                else:
+                    results, status = await self._answer_paraphrases(paraphrases)
+
+            answers = [a for a in results if isinstance(a, str)]
+            timed_out = [p for p, st in zip(paraphrases, status) if st == "timeout"]
+
+            if mode != "adaptive":
+                scores = []
+
+            if answers and not scores:
+                try:
+                    sims = await asyncio.to_thread(
+                        self._similarities, original_answer, answers
+                    )
+                    scores = [float(s) for s in sims]
+                except Exception as e:
+                    self.logger.warning(f"Similarity failed: {e}")
 
             # If similarity failed completely
             if not scores:
@@ -76,6 +351,8 @@ class RephraseConsistencyAnalyzer:
                     "consistency_score": 0.0,
                     "paraphrases": paraphrases,
                     "rephrased_answers": answers,
+                    "paraphrase_status": status,
+                    "timed_out": timed_out,
                     "reason": "similarity_failed"
                 }
 
@@ -85,7 +362,9 @@ class RephraseConsistencyAnalyzer:
             # Logging
             self.logger.info("Module 3 executed successfully")
             self.logger.info(f"Q_original : {question}")
+            self.logger.info(f"Mode       : {mode} ({source} paraphrases)")
             self.logger.info(f"Paraphrases: {paraphrases}")
+            self.logger.info(f"Status     : {status}")
             self.logger.info(f"Scores     : {[round(s,4) for s in scores]}")
             self.logger.info(f"FinalScore : {final_score:.4f}")
 
@@ -93,6 +372,12 @@ class RephraseConsistencyAnalyzer:
                 "consistency_score": final_score,
                 "paraphrases": paraphrases,
                 "rephrased_answers": answers,
+                "paraphrase_status": status,
+                "timed_out": timed_out,
+                "answered_k": sum(st == "ok" for st in status),
+                "stopped_early": "skipped" in status,
+                "mode": mode,
+                "paraphraser": source,
                 "reason": None
             }
 
@@ -103,4 +388,9 @@ class RephraseConsistencyAnalyzer:
                 "paraphrases": [],
                 "rephrased_answers": [],
                 "reason": "exception"
-            }
\ No newline at end of file
+            }
+
+
+def _check_paraphraser(paraphraser: str) -> None:
+    if paraphraser not in ("llm", "rules"):
+        raise ValueError(f"paraphraser must be 'llm' or 'rules', got {paraphraser!r}")
@@ -1,7 +1,34 @@
-from llm_interface.real_llm import llm_answer
+import json
+import re
 
+from llm_interface.real_llm import allm_answer, allm_complete, run_sync
 
-def rephrase_question(question: str, k: int = 3) -> list[str]:
+FUSED_SYSTEM = "You are a precise assistant that returns only valid JSON."
+
+# Rough completion budget per paraphrase + answer pair
+_FUSED_TOKENS_PER_ITEM = 160
+# Rough completion budget per paraphrase (top-up calls)
+_TOKENS_PER_PARAPHRASE = 40
+
+# List markers the LLM puts in front of paraphrases: "-", "*", "1.", "2)",
+# "(3)", "Paraphrase 1:", "Q2:"
+_LIST_MARKER = re.compile(
+    r"^\s*(?:[-*•]+|\(?\d+[.):]|(?:paraphrase|question|q)\s*\d*\s*[:.)-])\s*",
+    re.IGNORECASE
+)
+
+
+def parse_paraphrase_lines(response: str) -> list[str]:
+    """One paraphrase per non-empty line, list markers and quotes removed."""
+    paraphrases = []
+    for line in response.split("\n"):
+        line = _LIST_MARKER.sub("", line).strip().strip('"').strip()
+        if line:
+            paraphrases.append(line)
+    return paraphrases
+
+
+async def arephrase_question(question: str, k: int = 3) -> list[str]:
     """
     Generate k paraphrases of a question using real LLM.
     """
@@ -12,12 +39,154 @@ def rephrase_question(question: str, k: int = 3) -> list[str]:
         f"Question: {question}"
     )
 
-    response = llm_answer(prompt)
+    response = await allm_answer(prompt)
+
+    return parse_paraphrase_lines(response)[:k]
 
-    paraphrases = [
-        line.strip("- ").strip()
-        for line in response.split("\n")
-        if line.strip()
-    ]
 
-    return paraphrases[:k]
+def rephrase_question(question: str, k: int = 3) -> list[str]:
+    return run_sync(arephrase_question(question, k=k))
+
+
+# -------------------------------------------------
+# Near-duplicate filtering
+# -------------------------------------------------
+def _normalized(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+def distinct_paraphrases(
+    question: str,
+    candidates: list[str],
+    embed,
+    threshold: float = 0.95
+) -> list[str]:
+    """
+    Drop candidates that repeat the question or an earlier candidate.
+
+    - exact repeats after lower-casing and stripping punctuation go first
+      (numbered echoes of the original question)
+    - then a greedy pass over cosine similarity: a candidate is kept only
+      if it is below `threshold` against the question and every kept one
+
+    `embed(texts)` must return L2-normalized rows (e.g. analyzer.embed).
+    Candidate order is preserved.
+    """
+    seen = {_normalized(question)}
+    unique = []
+    for candidate in candidates:
+        key = _normalized(candidate)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(candidate)
+
+    if not unique:
+        return []
+
+    emb = embed([question] + unique)
+    kept = [0]  # row 0 is the question
+
+    for i in range(1, len(emb)):
+        if float((emb[kept] @ emb[i]).max()) < threshold:
+            kept.append(i)
+
+    return [unique[i - 1] for i in kept[1:]]
+
+
+async def atop_up_paraphrases(question: str, n: int, avoid: list[str]) -> list[str]:
+    """
+    Cheap regeneration for the dedup stage: n more paraphrases, worded
+    differently from `avoid`, on a small completion budget.
+    """
+    listed = "\n".join(f"- {a}" for a in avoid)
+    prompt = (
+        f"Generate {n} different paraphrases of the following question.\n"
+        f"Each must be worded differently from the question and from these:\n"
+        f"{listed}\n"
+        f"Return only the paraphrased questions, one per line.\n\n"
+        f"Question: {question}"
+    )
+
+    response = await allm_complete(
+        prompt,
+        temperature=0.8,
+        max_tokens=_TOKENS_PER_PARAPHRASE * n
+    )
+
+    return parse_paraphrase_lines(response)[:n]
+
+
+# -------------------------------------------------
+# Fused mode: paraphrases + answers in ONE call
+# -------------------------------------------------
+def _pairs_from(data) -> list[tuple[str, str]]:
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("paraphrases") or data.get("results")
+
+    if not isinstance(data, list):
+        return []
+
+    pairs = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        paraphrase = item.get("paraphrase") or item.get("question")
+        answer = item.get("answer")
+        if not isinstance(paraphrase, str) or not isinstance(answer, str):
+            continue
+        if paraphrase.strip() and answer.strip():
+            pairs.append((paraphrase.strip(), answer.strip()))
+
+    return pairs
+
+
+def parse_fused_response(text: str, k: int) -> list[tuple[str, str]] | None:
+    """
+    Parse the fused JSON response into (paraphrase, answer) pairs.
+
+    Tolerates markdown code fences, prose around the JSON, a bare list
+    instead of {"items": [...]}, and "question" instead of "paraphrase".
+    Returns None if nothing usable is found.
+    """
+    if not text:
+        return None
+
+    text = re.sub(r"```(?:json)?", "", text)
+    decoder = json.JSONDecoder()
+
+    # Try every "{" / "[" as a JSON start until one yields usable pairs
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            data, _ = decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            continue
+
+        pairs = _pairs_from(data)
+        if pairs:
+            return pairs[:k]
+
+    return None
+
+
+async def arephrase_and_answer(question: str, k: int = 3) -> list[tuple[str, str]] | None:
+    """
+    Generate k paraphrases AND answer each one in a single LLM call.
+    Returns None if the response cannot be parsed (caller falls back).
+    """
+
+    prompt = (
+        f"Generate {k} different paraphrases of the following question, "
+        f"then answer each paraphrase factually and concisely as if it were "
+        f"asked on its own.\n"
+        f'Return only JSON of the form {{"items": [{{"paraphrase": "...", "answer": "..."}}]}} '
+        f"with exactly {k} items.\n\n"
+        f"Question: {question}"
+    )
+
+    response = await allm_complete(
+        prompt,
+        system=FUSED_SYSTEM,
+        max_tokens=_FUSED_TOKENS_PER_ITEM * k
+    )
+
+    return parse_fused_response(response, k)
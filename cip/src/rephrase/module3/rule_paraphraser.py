@@ -0,0 +1,280 @@
+# cip/src/rephrase/module3/rule_paraphraser.py
+
+"""
+Local rule-based paraphrases from a spaCy parse — no LLM round trip.
+
+Uses the en_core_web_sm pipeline already loaded for the negation module
+(NER and lemmatizer skipped). Rewrites, in order of preference:
+
+  • embedded question   — "Why is the sky blue?" → "Can you tell me why
+                           the sky is blue?" (auxiliary moved back after
+                           the subject)
+  • wh-synonym template — "Why …" → "For what reason …", "How many …" →
+                           "What number of …", "What color …" → "Which color …"
+  • reordering          — adverbial clause moved to the other end
+                           ("If you …, what happens?"), or the wh-phrase
+                           left in place ("The capital of France is what?")
+  • yes/no inversion    — "Is X Y?" → "Is it true that X is Y?"
+
+Cost: a cold question pays one spaCy parse (a few ms with
+en_core_web_sm); the rewrite rules themselves are sub-millisecond.
+Results are cached per question, so a repeat costs only the lookup.
+"""
+
+import functools
+import re
+
+from negation.rule_negator import get_nlp
+
+_WH_WORDS = {"what", "which", "who", "whom", "whose", "where", "when", "why", "how"}
+_SUBJECT_DEPS = {"nsubj", "nsubjpass", "expl"}
+
+# Leading wh-phrase → replacements that keep the original word order
+_WH_SYNONYMS = {
+    "why": ["For what reason"],
+    "who": ["Which person"],
+    "whom": ["Which person"],
+    "how many": ["What number of"],
+    "how much": ["What amount of"],
+    "how old": ["What age"],
+}
+# Not "where" / "when" / "how long": their templates ("In what place",
+# "At what time", "For how much time") narrow or change the question
+
+# Wh-words that cannot be left at the end of the clause ("X is why?")
+_ADVERBIAL_WH = {"why", "how", "when", "where"}
+
+_EMBEDDED_TEMPLATES = ("Can you tell me {}?", "Do you know {}?")
+_YES_NO_TEMPLATES = ("Is it true that {}?", "Would you say that {}?")
+
+_CACHE_SIZE = 4096
+
+
+# -------------------------------------------------
+# Text helpers
+# -------------------------------------------------
+def _text(tokens) -> str:
+    return "".join(t.text_with_ws for t in tokens).strip()
+
+
+def _lower_first(tokens) -> str:
+    """Span text, de-capitalized if it started the sentence."""
+    text = _text(tokens)
+    if tokens and tokens[0].i == 0 and tokens[0].pos_ != "PROPN" and tokens[0].text != "I":
+        return text[:1].lower() + text[1:]
+    return text
+
+
+def _capitalize(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def _normalized(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+# -------------------------------------------------
+# Clause analysis
+# -------------------------------------------------
+def _clause_parts(body) -> dict | None:
+    """
+    Split an inverted question into wh-phrase / auxiliary / subject / rest.
+
+      "What color is the sky today"  → wh "What color", aux "is",
+                                        subj "the sky", rest "today"
+      "Is the sun a star"            → wh [], aux "Is", subj "the sun", …
+
+    None if there is no auxiliary in front of the subject.
+    """
+    verb = next((t for t in body if t.pos_ in ("AUX", "VERB")), None)
+    if verb is None or verb.pos_ != "AUX":
+        return None
+
+    subj = next(
+        (t for t in body if t.dep_ in _SUBJECT_DEPS and t.left_edge.i > verb.i),
+        None
+    )
+    if subj is None:
+        return None
+
+    start, stop = subj.left_edge.i, subj.right_edge.i + 1
+    aux = [t for t in body if verb.i <= t.i < start]
+
+    # Only auxiliaries and negation between the wh-phrase and the subject
+    if any(t.pos_ != "AUX" and t.dep_ != "neg" for t in aux):
+        return None
+
+    return {
+        "wh": [t for t in body if t.i < verb.i],
+        "aux": aux,
+        "subj": [t for t in body if start <= t.i < stop],
+        "rest": [t for t in body if t.i >= stop],
+    }
+
+
+def _declarative(parts: dict) -> str | None:
+    """
+    Subject + auxiliary + rest. Bare "do" is dropped; bare "does" / "did"
+    give up (the verb would need inflecting). Negated forms stay:
+    "why cats don't swim".
+    """
+    aux = parts["aux"]
+    if len(aux) == 1 and aux[0].lower_ in ("does", "did"):
+        return None
+    if len(aux) == 1 and aux[0].lower_ == "do":
+        aux = []
+
+    pieces = [_lower_first(parts["subj"]), _lower_first(aux), _text(parts["rest"])]
+    return " ".join(p for p in pieces if p)
+
+
+# "What number of" / "What amount of" need a noun after them
+_NEEDS_NOUN = {"how many", "how much"}
+
+
+def _noun_follows(body, i: int) -> bool:
+    """body[i] is a noun, or an adjective directly before one."""
+    nouns = ("NOUN", "PROPN")
+    if i < len(body) and body[i].pos_ in nouns:
+        return True
+    return i + 1 < len(body) and body[i].pos_ == "ADJ" and body[i + 1].pos_ in nouns
+
+
+def _wh_key(body) -> tuple[str, int] | None:
+    """(synonym key, tokens it covers) for a leading wh-word."""
+    first = body[0].lower_
+    if first == "how" and len(body) > 1 and f"how {body[1].lower_}" in _WH_SYNONYMS:
+        key = f"how {body[1].lower_}"
+        if key in _NEEDS_NOUN and not _noun_follows(body, 2):
+            return None  # "How much does a Tesla cost?"
+        return key, 2
+    if first in _WH_SYNONYMS:
+        return first, 1
+    return None
+
+
+# -------------------------------------------------
+# Rewrites
+# -------------------------------------------------
+def _embedded(body, parts: dict | None, is_wh: bool) -> list[str]:
+    if parts is None:
+        if not is_wh:
+            return []
+        # Wh-word is the subject: word order is already declarative
+        clause = _lower_first(body)
+    else:
+        decl = _declarative(parts)
+        if decl is None:
+            return []
+        clause = f"{_lower_first(parts['wh'])} {decl}" if is_wh else f"whether {decl}"
+
+    return [t.format(clause) for t in _EMBEDDED_TEMPLATES]
+
+
+def _wh_synonyms(body) -> list[str]:
+    out = []
+
+    key = _wh_key(body)
+    if key is not None:
+        name, n = key
+        rest = _text(body[n:])
+        out += [f"{s} {rest}?" for s in _WH_SYNONYMS[name]]
+
+    # "What color …" → "Which color …"
+    if body[0].lower_ == "what" and len(body) > 1 and body[0].dep_ == "det":
+        out.append(f"Which {_text(body[1:])}?")
+
+    return out
+
+
+def _reordered(body, parts: dict | None, is_wh: bool) -> list[str]:
+    out = []
+    root = next((t for t in body if t.dep_ == "ROOT"), None)
+
+    # Adverbial clause at one end → the other end
+    for clause in (root.children if root is not None else []):
+        if clause.dep_ != "advcl":
+            continue
+        lo, hi = clause.left_edge.i, clause.right_edge.i + 1
+        span = [t for t in body if lo <= t.i < hi]
+        others = [t for t in body if not lo <= t.i < hi and not t.is_punct]
+
+        if hi == len(body) and lo > 0:
+            out.append(f"{_capitalize(_text(span))}, {_lower_first(others)}?")
+        elif lo == 0 and hi < len(body):
+            out.append(f"{_capitalize(_text(others))} {_lower_first(span)}?")
+
+    # Wh-phrase left in place: "The capital of France is what?"
+    if is_wh and parts is not None and not (
+        len(parts["wh"]) == 1 and parts["wh"][0].lower_ in _ADVERBIAL_WH
+    ):
+        decl = _declarative(parts)
+        if decl is not None:
+            out.append(f"{_capitalize(decl)} {_lower_first(parts['wh'])}?")
+
+    return out
+
+
+def _yes_no(parts: dict | None, is_wh: bool) -> list[str]:
+    if is_wh or parts is None:
+        return []
+    decl = _declarative(parts)
+    if decl is None:
+        # Emphatic do keeps the verb form: "X does eat Y"
+        pieces = [_lower_first(parts["subj"]), _lower_first(parts["aux"]), _text(parts["rest"])]
+        decl = " ".join(p for p in pieces if p)
+    return [t.format(decl) for t in _YES_NO_TEMPLATES]
+
+
+def paraphrases_from_doc(doc, k: int = 3) -> list[str]:
+    """Up to k distinct rewrites of a parsed question (may return fewer)."""
+    body = [t for t in doc if not (t.is_punct and t.i == len(doc) - 1)]
+    if len(body) < 2:
+        return []
+
+    parts = _clause_parts(body)
+    if parts is None:
+        is_wh = body[0].lower_ in _WH_WORDS
+    else:
+        is_wh = any(t.lower_ in _WH_WORDS for t in parts["wh"])
+        if parts["wh"] and not is_wh:
+            parts = None  # fronted non-wh material ("Today, is …"): leave it
+
+    groups = [
+        _embedded(body, parts, is_wh),
+        _wh_synonyms(body) if is_wh else [],
+        _reordered(body, parts, is_wh),
+        _yes_no(parts, is_wh),
+    ]
+
+    # Round-robin across rewrite types so k=2 or 3 mixes them
+    ordered = []
+    for i in range(max(map(len, groups))):
+        ordered += [g[i] for g in groups if i < len(g)]
+
+    seen = {_normalized(doc.text)}
+    out = []
+    for candidate in ordered:
+        key = _normalized(candidate)
+        if key not in seen:
+            seen.add(key)
+            out.append(candidate)
+
+    return out[:k]
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _cached(question: str, k: int) -> tuple[str, ...]:
+    doc = get_nlp()(question, disable=["ner", "lemmatizer"])
+    return tuple(paraphrases_from_doc(doc, k))
+
+
+def rule_paraphrases(question: str, k: int = 3) -> list[str]:
+    """
+    Up to k paraphrases of `question` from spaCy rules (no LLM call).
+    May return fewer than k — or none — for unusual question shapes.
+    """
+    question = question.strip()
+    if not question:
+        return []
+    return list(_cached(question, k))
@@ -0,0 +1,82 @@
+# cip/src/test/benchmark_fused_rephrase.py
+#
+# Module 3: separate (k+1 LLM calls) vs fused (1 LLM call) rephrase mode
+# on TruthfulQA. Reports consistency-score agreement and latency.
+#
+#   python -m test.benchmark_fused_rephrase --n 50 --k 3
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from llm_interface.real_llm import llm_answer
+from rephrase.module3.rephrase_consistency import RephraseConsistencyAnalyzer
+
+
+TRUTHFULQA_PATH = "../data/truthfulQA/TruthfulQA.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50, help="number of TruthfulQA questions")
+    parser.add_argument("--k", type=int, default=3, help="paraphrases per question")
+    parser.add_argument("--out", default=None, help="optional CSV with per-question scores")
+    args = parser.parse_args()
+
+    questions = pd.read_csv(TRUTHFULQA_PATH)["Question"].dropna().tolist()[:args.n]
+
+    m3 = RephraseConsistencyAnalyzer(num_paraphrases=args.k, enable_logging=False)
+
+    rows = []
+
+    for q in questions:
+        try:
+            answer = llm_answer(q)
+        except Exception as e:
+            print(f"Skipping (no answer): {q[:50]} — {e}")
+            continue
+
+        row = {"question": q}
+
+        for fused in (False, True):
+            m3.fused = fused
+            name = "fused" if fused else "separate"
+
+            start = time.perf_counter()
+            out = m3.run(q, answer)
+            row[f"{name}_latency"] = time.perf_counter() - start
+            row[f"{name}_score"] = out["consistency_score"]
+            row[f"{name}_mode"] = out.get("mode")
+
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+
+    if df.empty:
+        print("No questions scored.")
+        return
+
+    diff = (df["fused_score"] - df["separate_score"]).abs()
+    fallback_rate = (df["fused_mode"] != "fused").mean()
+
+    print("\nFused vs separate rephrase mode")
+    print("-------------------------------------------------")
+    print(f"Questions           : {len(df)}  (k={args.k})")
+    print(f"Mean score separate : {df['separate_score'].mean():.4f}")
+    print(f"Mean score fused    : {df['fused_score'].mean():.4f}")
+    print(f"Mean |difference|   : {diff.mean():.4f}")
+    if len(df) > 1:
+        print(f"Pearson r           : {np.corrcoef(df['separate_score'], df['fused_score'])[0, 1]:.4f}")
+    print(f"Fused fallback rate : {fallback_rate:.1%}")
+    print(f"Latency separate    : {df['separate_latency'].mean():.2f}s  (p95 {df['separate_latency'].quantile(0.95):.2f}s)")
+    print(f"Latency fused       : {df['fused_latency'].mean():.2f}s  (p95 {df['fused_latency'].quantile(0.95):.2f}s)")
+
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"\nPer-question scores written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# cip/src/test/benchmark_llm_replay.py
+#
+# Offline LLM throughput benchmark.
+#
+#   1) Record once (needs GROQ_API_KEY):
+#        CIP_LLM_BACKEND=record python -m test.benchmark_llm_replay --n 50
+#   2) Replay anywhere, no network:
+#        CIP_LLM_BACKEND=replay CIP_LLM_REPLAY_SEED=0 \
+#        CIP_LLM_REPLAY_JITTER=0.05 python -m test.benchmark_llm_replay --n 50
+
+import argparse
+import time
+
+import pandas as pd
+
+from llm_interface.backends import get_backend
+from llm_interface.rate_limiter import get_rate_limiter
+from llm_interface.real_llm import MAX_CONCURRENCY, llm_answer, llm_answer_many
+
+
+TRUTHFULQA_PATH = "../data/truthfulQA/TruthfulQA.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50, help="number of TruthfulQA questions")
+    args = parser.parse_args()
+
+    questions = pd.read_csv(TRUTHFULQA_PATH)["Question"].dropna().tolist()[:args.n]
+    backend = get_backend()
+
+    print(f"Backend: {backend.name} | Questions: {len(questions)}")
+
+    # Count upstream calls in flight to check the concurrency bound
+    in_flight = {"now": 0, "peak": 0}
+    complete = backend.complete
+
+    async def tracked_complete(*args, **kwargs):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            return await complete(*args, **kwargs)
+        finally:
+            in_flight["now"] -= 1
+
+    backend.complete = tracked_complete
+
+    # -------- Sequential
+    start = time.perf_counter()
+    for q in questions:
+        try:
+            llm_answer(q)
+        except Exception:
+            pass
+    sequential = time.perf_counter() - start
+
+    # -------- Concurrent
+    start = time.perf_counter()
+    results = llm_answer_many(questions, return_exceptions=True)
+    concurrent = time.perf_counter() - start
+
+    failed = sum(isinstance(r, BaseException) for r in results)
+
+    print(f"Sequential : {sequential:.2f}s  ({len(questions) / sequential:.1f} q/s)")
+    print(f"Concurrent : {concurrent:.2f}s  ({len(questions) / concurrent:.1f} q/s)")
+    print(f"Failed     : {failed}")
+    print(f"Peak in flight : {in_flight['peak']}  (bound {MAX_CONCURRENCY}, "
+          f"AIMD limits {get_rate_limiter(MAX_CONCURRENCY).stats()['concurrency_limits']})")
+
+    assert in_flight["peak"] <= MAX_CONCURRENCY, "concurrency bound exceeded"
+
+    if hasattr(backend, "stats"):
+        print("Backend stats:", backend.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# cip/src/test/benchmark_rule_paraphrases.py
+#
+# Module 3: LLM paraphrases vs local spaCy rule paraphrases on
+# TruthfulQA. Reports parse / rule latency and rule coverage, then
+# consistency-score agreement (mean |difference|, Pearson r, same
+# fusion band) and end-to-end latency of both paraphrase sources.
+#
+#   python -m test.benchmark_rule_paraphrases --n 50 --k 3
+#   python -m test.benchmark_rule_paraphrases --n 500 --latency-only
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from fusion.fusion_layer import CONSISTENCY_STRONG, CONSISTENCY_MODERATE
+from llm_interface.real_llm import llm_answer
+from negation.rule_negator import get_nlp
+from rephrase.module3.rephrase_consistency import RephraseConsistencyAnalyzer
+from rephrase.module3.rule_paraphraser import paraphrases_from_doc
+
+
+TRUTHFULQA_PATH = "../data/truthfulQA/TruthfulQA.csv"
+
+
+def _band(score: float) -> int:
+    """Fusion band: 0 strong boost, 1 moderate boost, 2 none."""
+    return int(np.searchsorted([CONSISTENCY_STRONG, CONSISTENCY_MODERATE], score, side="right"))
+
+
+def rule_latency(questions: list[str], k: int) -> None:
+    nlp = get_nlp()
+    nlp("Warm up the pipeline?")
+
+    parse_ms, rule_ms, counts = [], [], []
+    for q in questions:
+        start = time.perf_counter()
+        doc = nlp(q, disable=["ner", "lemmatizer"])
+        parse_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        counts.append(len(paraphrases_from_doc(doc, k)))
+        rule_ms.append((time.perf_counter() - start) * 1000)
+
+    parse_ms, rule_ms, counts = map(np.array, (parse_ms, rule_ms, counts))
+    total = parse_ms + rule_ms
+
+    print("\nRule paraphraser (uncached)")
+    print("-------------------------------------------------")
+    print(f"Questions           : {len(questions)}  (k={k})")
+    print(f"spaCy parse         : {parse_ms.mean():.3f} ms  (p95 {np.percentile(parse_ms, 95):.3f} ms)")
+    print(f"Rewrite rules       : {rule_ms.mean():.3f} ms  (p95 {np.percentile(rule_ms, 95):.3f} ms)")
+    print(f"Total               : {total.mean():.3f} ms  (p95 {np.percentile(total, 95):.3f} ms)")
+    print(f"Full k coverage     : {(counts >= k).mean():.1%}")
+    print(f"No rule applies     : {(counts == 0).mean():.1%}  (LLM fallback)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50, help="number of TruthfulQA questions")
+    parser.add_argument("--k", type=int, default=3, help="paraphrases per question")
+    parser.add_argument("--latency-only", action="store_true", help="skip the LLM comparison")
+    parser.add_argument("--out", default=None, help="optional CSV with per-question scores")
+    args = parser.parse_args()
+
+    questions = pd.read_csv(TRUTHFULQA_PATH)["Question"].dropna().tolist()[:args.n]
+
+    rule_latency(questions, args.k)
+    if args.latency_only:
+        return
+
+    m3 = RephraseConsistencyAnalyzer(num_paraphrases=args.k, enable_logging=False)
+
+    rows = []
+
+    for q in questions:
+        try:
+            answer = llm_answer(q)
+        except Exception as e:
+            print(f"Skipping (no answer): {q[:50]} — {e}")
+            continue
+
+        row = {"question": q}
+
+        for source in ("llm", "rules"):
+            start = time.perf_counter()
+            out = m3.run(q, answer, paraphraser=source)
+            row[f"{source}_latency"] = time.perf_counter() - start
+            row[f"{source}_score"] = out["consistency_score"]
+            row[f"{source}_used"] = out.get("paraphraser")
+
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+
+    if df.empty:
+        print("No questions scored.")
+        return
+
+    diff = (df["rules_score"] - df["llm_score"]).abs()
+    same_band = df["rules_score"].map(_band) == df["llm_score"].map(_band)
+    fallback_rate = (df["rules_used"] != "rules").mean()
+
+    print("\nRule vs LLM paraphrases")
+    print("-------------------------------------------------")
+    print(f"Questions           : {len(df)}  (k={args.k})")
+    print(f"Mean score LLM      : {df['llm_score'].mean():.4f}")
+    print(f"Mean score rules    : {df['rules_score'].mean():.4f}")
+    print(f"Mean |difference|   : {diff.mean():.4f}")
+    if len(df) > 1:
+        print(f"Pearson r           : {np.corrcoef(df['llm_score'], df['rules_score'])[0, 1]:.4f}")
+    print(f"Same fusion band    : {same_band.mean():.1%}")
+    print(f"Rules fallback rate : {fallback_rate:.1%}")
+    print(f"Latency LLM         : {df['llm_latency'].mean():.2f}s  (p95 {df['llm_latency'].quantile(0.95):.2f}s)")
+    print(f"Latency rules       : {df['rules_latency'].mean():.2f}s  (p95 {df['rules_latency'].quantile(0.95):.2f}s)")
+
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"\nPer-question scores written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# cip/src/test/test_rephrase_consistency.py
+#
+# RephraseConsistencyAnalyzer control flow with the LLM calls and
+# MiniLM similarities replaced by fakes.
+#
+#   python -m pytest test/test_rephrase_consistency.py -q
+#
+# The concurrent-answering tests run the real LLM client against a
+# ReplayBackend tape with per-paraphrase latencies and injected failures.
+
+import asyncio
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from llm_interface import backends, rate_limiter, real_llm  # noqa: E402
+from llm_interface.response_cache import ResponseCache  # noqa: E402
+from rephrase.module3 import rephrase_consistency as rc  # noqa: E402
+
+
+QUESTION = "Why is the sky blue?"
+ORIGINAL_ANSWER = "Because of Rayleigh scattering."
+PARAPHRASES = [
+    "What gives the sky its blue color?",
+    "For what reason is the sky blue?",
+    "Can you tell me why the sky is blue?",
+]
+
+
+def _analyzer(**kwargs) -> rc.RephraseConsistencyAnalyzer:
+    m3 = rc.RephraseConsistencyAnalyzer(enable_logging=False, **kwargs)
+    # Every answer counts as fully consistent: tests look at control flow
+    m3._similarities = lambda original, answers: np.ones(len(answers), dtype=np.float32)
+    return m3
+
+
+@pytest.fixture
+def separate_calls(monkeypatch):
+    """Fake the non-fused path; records the prompts it answers."""
+    asked = []
+
+    async def fake_rephrase(question, k=3):
+        return PARAPHRASES[:k]
+
+    async def fake_answer(prompt):
+        asked.append(prompt)
+        return f"Answer to: {prompt}"
+
+    monkeypatch.setattr(rc, "arephrase_question", fake_rephrase)
+    monkeypatch.setattr(rc, "allm_answer", fake_answer)
+    return asked
+
+
+def _fused_reply(monkeypatch, n: int):
+    async def fake_fused(question, k=3):
+        return [(p, f"Fused answer to: {p}") for p in PARAPHRASES[:n]] or None
+
+    monkeypatch.setattr(rc, "arephrase_and_answer", fake_fused)
+
+
+# -------------------------------------------------
+# Fused mode
+# -------------------------------------------------
+def test_fused_full_reply_needs_no_further_calls(monkeypatch, separate_calls):
+    _fused_reply(monkeypatch, 3)
+
+    out = asyncio.run(_analyzer(num_paraphrases=3, fused=True).arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["mode"] == "fused"
+    assert out["paraphrases"] == PARAPHRASES
+    assert out["answered_k"] == 3
+    assert separate_calls == []
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_fused_short_reply_falls_back_to_separate_calls(monkeypatch, separate_calls, n):
+    _fused_reply(monkeypatch, n)
+
+    out = asyncio.run(_analyzer(num_paraphrases=3, fused=True).arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["mode"] == "separate"
+    assert out["paraphrases"] == PARAPHRASES
+    assert out["rephrased_answers"] == [f"Answer to: {p}" for p in PARAPHRASES]
+    assert out["answered_k"] == 3
+    assert separate_calls == PARAPHRASES
+
+
+def test_fused_call_error_falls_back_to_separate_calls(monkeypatch, separate_calls):
+    async def failing_fused(question, k=3):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(rc, "arephrase_and_answer", failing_fused)
+
+    out = asyncio.run(_analyzer(num_paraphrases=3, fused=True).arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["mode"] == "separate"
+    assert out["answered_k"] == 3
+
+
+# -------------------------------------------------
+# Concurrent answering on the replay backend
+# -------------------------------------------------
+@pytest.fixture
+def replay(monkeypatch, tmp_path):
+    """
+    replay({paraphrase: latency}, failure_rate=0.0) installs a ReplayBackend
+    whose tape answers each listed paraphrase after `latency` seconds.
+    Paraphrases left off the tape fail with ReplayMissError.
+    """
+    async def fake_rephrase(question, k=3):
+        return PARAPHRASES[:k]
+
+    monkeypatch.setattr(rc, "arephrase_question", fake_rephrase)
+    # Fresh limiter (breaker state, AIMD) per test; no retry back-off
+    monkeypatch.setattr(rate_limiter, "_limiter", rate_limiter.RateLimiter(max_concurrency=8))
+    monkeypatch.setattr(rate_limiter, "MAX_RETRIES", 0)
+
+    def install(latencies: dict[str, float], failure_rate: float = 0.0):
+        path = tmp_path / "tape.jsonl.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for prompt, latency in latencies.items():
+                key = ResponseCache.make_key(
+                    real_llm.PRIMARY_MODEL, real_llm.PRIMARY_SYSTEM, prompt, 0.2, real_llm.MAX_TOKENS
+                )
+                f.write(json.dumps({"key": key, "response": f"Replayed answer to: {prompt}", "latency": latency}) + "\n")
+
+        backend = backends.ReplayBackend(str(path), failure_rate=failure_rate, seed=0)
+        monkeypatch.setattr(backends, "_backend", backend)
+        return backend
+
+    return install
+
+
+def _replayed(*paraphrases) -> list[str]:
+    return [f"Replayed answer to: {p}" for p in paraphrases]
+
+
+def test_quorum_scores_the_first_answers_and_cancels_the_rest(replay):
+    fast, medium, slow = PARAPHRASES
+    backend = replay({fast: 0.01, medium: 0.05, slow: 2.0})
+
+    m3 = _analyzer(num_paraphrases=3, quorum=2, answer_timeout=5.0)
+    out = asyncio.run(m3.arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["paraphrase_status"] == ["ok", "ok", "cancelled"]
+    assert out["rephrased_answers"] == _replayed(fast, medium)
+    assert out["answered_k"] == 2
+    assert out["timed_out"] == []
+    assert out["consistency_score"] == pytest.approx(1.0)
+    assert backend.calls == 3
+
+
+def test_quorum_does_not_count_failed_answers(replay):
+    fast, missing, slower = PARAPHRASES
+    replay({fast: 0.01, slower: 0.05})   # `missing` is not on the tape
+
+    m3 = _analyzer(num_paraphrases=3, quorum=2, answer_timeout=5.0)
+    out = asyncio.run(m3.arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["paraphrase_status"] == ["ok", "error", "ok"]
+    assert out["rephrased_answers"] == _replayed(fast, slower)
+    assert out["answered_k"] == 2
+
+
+def test_timeout_keeps_the_answers_that_arrived(replay):
+    fast, slow, medium = PARAPHRASES
+    replay({fast: 0.01, slow: 2.0, medium: 0.05})
+
+    m3 = _analyzer(num_paraphrases=3, answer_timeout=0.5)
+    out = asyncio.run(m3.arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["paraphrase_status"] == ["ok", "timeout", "ok"]
+    assert out["rephrased_answers"] == _replayed(fast, medium)
+    assert out["timed_out"] == [slow]
+    assert out["answered_k"] == 2
+    assert out["consistency_score"] == pytest.approx(1.0)
+
+
+def test_all_answers_failed_scores_zero(replay):
+    backend = replay({p: 0.01 for p in PARAPHRASES}, failure_rate=1.0)
+
+    m3 = _analyzer(num_paraphrases=3, quorum=2, answer_timeout=5.0)
+    out = asyncio.run(m3.arun(QUESTION, ORIGINAL_ANSWER))
+
+    assert out["paraphrase_status"] == ["error"] * 3
+    assert out["rephrased_answers"] == []
+    assert out["consistency_score"] == 0.0
+    assert backend.failures == 3
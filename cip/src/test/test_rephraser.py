@@ -0,0 +1,143 @@
+# cip/src/test/test_rephraser.py
+#
+# Unit tests for rephrase/module3/rephraser.py (no LLM calls).
+#
+#   python -m pytest test/test_rephraser.py -q
+
+import json
+
+import numpy as np
+import pytest
+
+from rephrase.module3.rephraser import distinct_paraphrases, parse_fused_response
+
+
+def _embedder(vectors: dict[str, list[float]]):
+    """embed(texts) over a fixed text → vector table, rows L2-normalized."""
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        rows = np.array([vectors[t] for t in texts], dtype=np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+    embed.calls = calls
+    return embed
+
+
+# -------------------------------------------------
+# distinct_paraphrases
+# -------------------------------------------------
+QUESTION = "Why is the sky blue?"
+
+
+def test_distinct_drops_textual_echoes_of_the_question():
+    embed = _embedder({
+        QUESTION: [1, 0, 0],
+        "What makes the sky look blue?": [0, 1, 0],
+    })
+    candidates = ["why is the sky blue", "Why is the sky blue?!", "", "What makes the sky look blue?"]
+
+    assert distinct_paraphrases(QUESTION, candidates, embed) == ["What makes the sky look blue?"]
+    # Echoes never reach the embedder
+    assert embed.calls == [[QUESTION, "What makes the sky look blue?"]]
+
+
+def test_distinct_drops_near_duplicates_by_cosine():
+    embed = _embedder({
+        QUESTION: [1, 0, 0],
+        "Why does the sky appear blue?": [0.99, 0.1, 0],    # ~ the question
+        "What makes the sky look blue?": [0, 1, 0],
+        "What causes the sky to look blue?": [0, 1, 0.05],  # ~ the previous one
+        "For what reason is the sky blue?": [0, 0, 1],
+    })
+    candidates = [
+        "Why does the sky appear blue?",
+        "What makes the sky look blue?",
+        "What causes the sky to look blue?",
+        "For what reason is the sky blue?",
+    ]
+
+    assert distinct_paraphrases(QUESTION, candidates, embed, threshold=0.95) == [
+        "What makes the sky look blue?",
+        "For what reason is the sky blue?",
+    ]
+
+
+def test_distinct_respects_threshold_and_keeps_order():
+    embed = _embedder({
+        QUESTION: [1, 0],
+        "B": [0, 1],
+        "A": [0.6, 0.8],   # cosine 0.8 to B, 0.6 to the question
+    })
+
+    assert distinct_paraphrases(QUESTION, ["B", "A"], embed, threshold=0.85) == ["B", "A"]
+    assert distinct_paraphrases(QUESTION, ["B", "A"], embed, threshold=0.75) == ["B"]
+
+
+def test_distinct_with_no_candidates_skips_the_embedder():
+    embed = _embedder({})
+
+    assert distinct_paraphrases(QUESTION, [], embed) == []
+    assert distinct_paraphrases(QUESTION, [QUESTION.upper()], embed) == []
+    assert embed.calls == []
+
+
+# -------------------------------------------------
+# parse_fused_response
+# -------------------------------------------------
+ITEMS = [
+    {"paraphrase": "What gives the sky its blue color?", "answer": "Rayleigh scattering."},
+    {"paraphrase": "For what reason is the sky blue?", "answer": "Sunlight scatters off air molecules."},
+    {"paraphrase": "Can you tell me why the sky is blue?", "answer": "Blue light scatters most."},
+]
+PAIRS = [(i["paraphrase"], i["answer"]) for i in ITEMS]
+
+
+def test_fused_parses_the_requested_shape():
+    assert parse_fused_response(json.dumps({"items": ITEMS}), k=3) == PAIRS
+
+
+def test_fused_tolerates_fences_prose_bare_lists_and_question_key():
+    fenced = "Here you go:\n```json\n" + json.dumps({"items": ITEMS}) + "\n```\nHope this helps."
+    assert parse_fused_response(fenced, k=3) == PAIRS
+
+    bare = json.dumps([{"question": p, "answer": a} for p, a in PAIRS])
+    assert parse_fused_response(bare, k=3) == PAIRS
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "Sorry, I cannot help with that.",
+    '{"items": [{"paraphrase": "Why is the sky blue?", "answer": ',   # truncated
+    '{"items": []}',
+    '{"items": [{"paraphrase": "Why?"}, {"answer": "Because."}]}',   # missing fields
+    '{"items": [{"paraphrase": "  ", "answer": "Because."}]}',       # blank paraphrase
+    '{"items": [["Why?", "Because."]]}',                             # not objects
+])
+def test_fused_malformed_returns_none(text):
+    assert parse_fused_response(text, k=3) is None
+
+
+def test_fused_skips_broken_items_and_strips_whitespace():
+    text = json.dumps({"items": [
+        {"paraphrase": " What gives the sky its blue color? ", "answer": " Rayleigh scattering. "},
+        {"paraphrase": "Why?", "answer": None},
+        "not an item",
+    ]})
+    assert parse_fused_response(text, k=3) == [PAIRS[0]]
+
+
+def test_fused_short_reply_returns_what_is_there():
+    assert parse_fused_response(json.dumps({"items": ITEMS[:2]}), k=3) == PAIRS[:2]
+
+
+def test_fused_over_long_reply_is_cut_to_k():
+    extra = ITEMS + [{"paraphrase": "Why does the sky look blue?", "answer": "Scattering."}]
+    assert parse_fused_response(json.dumps({"items": extra}), k=3) == PAIRS
+    assert parse_fused_response(json.dumps({"items": extra}), k=1) == PAIRS[:1]
+
+
+def test_fused_skips_unusable_json_before_the_payload():
+    text = 'Format: {"items": [...]}\n' + json.dumps({"items": ITEMS})
+    assert parse_fused_response(text, k=3) == PAIRS